@@ -0,0 +1,116 @@
+"""
+Benchmark approximate retrieval against exact search for the Voizy recommender.
+
+Reports recall@k and per-request latency of the IVF index for a range of
+probe counts. Uses a saved model when --model-path is given, otherwise
+synthetic clustered embeddings.
+"""
+import sys
+import time
+import pickle
+import logging
+import argparse
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from voizy.recommender.scoring import ScoringEngine
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def synthetic_engine(n_users: int, n_items: int, dim: int, seed: int = 0) -> ScoringEngine:
+    """Build a scoring engine over clustered random embeddings"""
+    rng = np.random.default_rng(seed)
+    n_topics = max(1, int(np.sqrt(n_items)) // 4)
+
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    item_embeddings = topics[rng.integers(0, n_topics, n_items)] + 0.5 * rng.standard_normal((n_items, dim))
+    user_embeddings = topics[rng.integers(0, n_topics, n_users)] + 0.5 * rng.standard_normal((n_users, dim))
+
+    return ScoringEngine(
+        rng.normal(0, 0.1, n_users),
+        user_embeddings,
+        rng.normal(0, 0.1, n_items),
+        item_embeddings,
+        np.arange(n_items)
+    )
+
+
+def model_engine(model_path: str) -> ScoringEngine:
+    """Build a scoring engine from a model artifact or a pickled model"""
+    from voizy.recommender.artifact import is_artifact, read_artifact
+
+    if is_artifact(model_path):
+        arrays = read_artifact(model_path).arrays
+        return ScoringEngine(
+            arrays['user_biases'],
+            arrays['user_embeddings'],
+            arrays['item_biases'],
+            arrays['item_embeddings'],
+            arrays['post_ids']
+        )
+
+    with open(f"{model_path}_model.pkl", 'rb') as f:
+        model = pickle.load(f)
+
+    n_users, n_posts = model.user_embeddings.shape[0], model.item_embeddings.shape[0]
+    if Path(f"{model_path}_post_ids.npy").exists():
+        n_users = len(np.load(f"{model_path}_user_ids.npy", mmap_mode='r'))
+        n_posts = len(np.load(f"{model_path}_post_ids.npy", mmap_mode='r'))
+
+    return ScoringEngine.from_model(model, np.arange(n_posts), n_users)
+
+
+def main():
+    """Main function to run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model-path', help="Saved model path prefix (default: synthetic data)")
+    parser.add_argument('--n-items', type=int, default=1_000_000)
+    parser.add_argument('--n-users', type=int, default=10_000)
+    parser.add_argument('--dim', type=int, default=30)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--n-lists', type=int, default=0)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    if args.model_path:
+        engine = model_engine(args.model_path)
+    else:
+        engine = synthetic_engine(args.n_users, args.n_items, args.dim)
+
+    logger.info(f"Benchmarking {engine.n_items} posts, {engine.n_users} users, k={args.k}")
+
+    rng = np.random.default_rng(1)
+    queries = rng.choice(engine.n_users, min(args.queries, engine.n_users), replace=False)
+
+    start = time.perf_counter()
+    exact = [set(engine.top_k(user_idx, args.k)[0].tolist()) for user_idx in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+    logger.info(f"exact: {exact_ms:.3f} ms/request")
+
+    start = time.perf_counter()
+    engine.build_ann_index(n_lists=args.n_lists)
+    logger.info(f"Index built in {time.perf_counter() - start:.1f}s")
+
+    for n_probe in args.n_probe:
+        engine.ann_index.n_probe = n_probe
+
+        start = time.perf_counter()
+        approximate = [set(engine.top_k(user_idx, args.k)[0].tolist()) for user_idx in queries]
+        ann_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        recall = np.mean([len(a & e) / len(e) for a, e in zip(approximate, exact)])
+        logger.info(f"n_probe={n_probe}: recall@{args.k}={recall:.3f}, {ann_ms:.3f} ms/request")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
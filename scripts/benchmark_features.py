@@ -0,0 +1,125 @@
+"""
+Benchmark the feature pipeline against the LightFM Dataset builders.
+
+Builds user and post feature matrices from synthetic feature DataFrames
+with both paths, reports the time each takes and checks that they
+produce the same matrices.
+"""
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from voizy.recommender.data import (
+    extract_user_features,
+    extract_post_features,
+    build_user_features_matrix,
+    build_post_features_matrix
+)
+from voizy.recommender.features import build_user_features, build_post_features
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def synthetic_frames(n_users: int, n_posts: int, seed: int = 0):
+    """Build user and post feature DataFrames shaped like the feature queries"""
+    rng = np.random.default_rng(seed)
+    interests = np.array([f"interest{i}" for i in range(200)])
+    hashtags = np.array([f"tag{i}" for i in range(5000)])
+
+    user_features_df = pd.DataFrame({
+        'user_id': np.arange(n_users),
+        'city_of_residence': rng.choice([f"city{i}" for i in range(500)] + [None], n_users),
+        'age': rng.integers(13, 80, n_users).astype(float),
+        'interests': [",".join(rng.choice(interests, rng.integers(0, 6), replace=False)) for _ in range(n_users)]
+    })
+
+    # One row per post from the first SELECT, then hashtag-only rows as in the UNION
+    posts = pd.DataFrame({
+        'post_id': np.arange(n_posts),
+        'author_id': rng.integers(0, n_users, n_posts).astype(float),
+        'is_poll': rng.integers(0, 2, n_posts),
+        'has_location': rng.integers(0, 2, n_posts),
+        'media_type': rng.choice(['image', 'video', 'image,video', None], n_posts),
+        'hashtags': None
+    })
+    tagged = rng.choice(n_posts, n_posts // 2, replace=False)
+    hashtag_rows = pd.DataFrame({
+        'post_id': tagged,
+        'author_id': np.nan,
+        'is_poll': np.nan,
+        'has_location': np.nan,
+        'media_type': None,
+        'hashtags': [",".join(rng.choice(hashtags, rng.integers(1, 4), replace=False)) for _ in tagged]
+    })
+
+    return user_features_df, pd.concat([posts, hashtag_rows], ignore_index=True)
+
+
+def dataset_path(user_features_df, post_features_df, user_ids, post_ids):
+    """Build both matrices through extract_*/Dataset.fit/build_*_features_matrix"""
+    from lightfm.data import Dataset
+
+    user_features = extract_user_features(user_features_df)
+    post_features = extract_post_features(post_features_df)
+
+    dataset = Dataset()
+    dataset.fit(users=user_ids, items=post_ids, user_features=user_features, item_features=post_features)
+
+    user_mapping = {int(user): i for i, user in enumerate(user_ids)}
+    post_mapping = {int(post): i for i, post in enumerate(post_ids)}
+
+    return (
+        build_user_features_matrix(user_features_df, user_mapping, dataset, user_features),
+        build_post_features_matrix(post_features_df, post_mapping, dataset, post_features)
+    )
+
+
+def pipeline_path(user_features_df, post_features_df, user_ids, post_ids):
+    """Build both matrices with the feature pipeline"""
+    return (
+        build_user_features(user_features_df, user_ids).matrix,
+        build_post_features(post_features_df, post_ids).matrix
+    )
+
+
+def main():
+    """Main function to run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--n-users', type=int, default=200_000)
+    parser.add_argument('--n-posts', type=int, default=500_000)
+    args = parser.parse_args()
+
+    user_features_df, post_features_df = synthetic_frames(args.n_users, args.n_posts)
+    rng = np.random.default_rng(1)
+    user_ids = rng.permutation(args.n_users)
+    post_ids = rng.permutation(args.n_posts)
+
+    logger.info(f"Benchmarking {len(user_features_df)} user rows, {len(post_features_df)} post rows")
+
+    results = {}
+    for name, path in (('dataset', dataset_path), ('pipeline', pipeline_path)):
+        start = time.perf_counter()
+        results[name] = path(user_features_df, post_features_df, user_ids, post_ids)
+        logger.info(f"{name}: {time.perf_counter() - start:.2f}s")
+
+    for label, expected, actual in zip(('user', 'post'), results['dataset'], results['pipeline']):
+        if expected.shape != actual.shape or abs(expected - actual).max() > 1e-6:
+            logger.error(f"{label} features differ: {expected.shape} vs {actual.shape}")
+            return 1
+
+    logger.info("Feature matrices match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
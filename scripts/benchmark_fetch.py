@@ -0,0 +1,105 @@
+"""
+Benchmark peak memory of building the interactions matrix.
+
+Feeds synthetic interaction chunks, shaped like the interactions query,
+through the DataFrame path (concatenate every chunk, then prepare_data)
+and through InteractionArraysBuilder, and reports the peak traced memory
+of each against the size of the final CSR matrix.
+"""
+import sys
+import time
+import logging
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from voizy.recommender.interactions import InteractionArrays, InteractionArraysBuilder
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+INTERACTION_TYPES = np.array(['view', 'reaction', 'comment', 'share'], dtype=object)
+
+
+def synthetic_chunks(n_users: int, n_posts: int, n_interactions: int, chunksize: int, seed: int = 0):
+    """Yield interaction DataFrames as read_sql_chunks would"""
+    rng = np.random.default_rng(seed)
+    start = datetime.now() - timedelta(days=30)
+
+    for offset in range(0, n_interactions, chunksize):
+        n = min(chunksize, n_interactions - offset)
+        types = rng.integers(0, 4, n)
+        yield pd.DataFrame({
+            'user_id': rng.integers(1, n_users, n),
+            'post_id': rng.integers(1, n_posts, n),
+            'interaction_strength': np.array([1, 3, 4, 5])[types],
+            'interaction_type': INTERACTION_TYPES[types],
+            'timestamp': pd.to_datetime(start) + pd.to_timedelta(rng.integers(0, 30 * 86400, n), unit='s')
+        })
+
+
+def measure(build) -> tuple:
+    """Run build under tracemalloc and return (result, peak bytes, seconds)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def main():
+    """Main function to run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--posts', type=int, default=500_000)
+    parser.add_argument('--interactions', type=int, default=10_000_000)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--with-timestamps', action='store_true')
+    args = parser.parse_args()
+
+    def chunks():
+        return synthetic_chunks(args.users, args.posts, args.interactions, args.chunksize)
+
+    def dataframe_path():
+        interactions_df = pd.concat(list(chunks()), ignore_index=True)
+        return InteractionArrays.from_frame(interactions_df, with_timestamps=args.with_timestamps).to_matrix()
+
+    def streaming_path():
+        builder = InteractionArraysBuilder(with_timestamps=args.with_timestamps)
+        for chunk in chunks():
+            builder.add_chunk(chunk)
+        return builder.finish().to_matrix()
+
+    matrix, dataframe_peak, dataframe_seconds = measure(dataframe_path)
+    matrix_bytes = matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    del matrix
+
+    matrix, streaming_peak, streaming_seconds = measure(streaming_path)
+    del matrix
+
+    mb = 1024 * 1024
+    logger.info(f"final CSR matrix: {matrix_bytes / mb:.0f} MB")
+    logger.info(
+        f"DataFrame path: peak {dataframe_peak / mb:.0f} MB "
+        f"({dataframe_peak / matrix_bytes:.1f}x matrix), {dataframe_seconds:.1f}s"
+    )
+    logger.info(
+        f"streaming path: peak {streaming_peak / mb:.0f} MB "
+        f"({streaming_peak / matrix_bytes:.1f}x matrix), {streaming_seconds:.1f}s"
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Benchmark serving worker start-up for the Voizy recommender.
+
+Starts fresh interpreters that import the API and create the app (and,
+with --model-path, memory-map a model artifact), and reports the median
+start-up time and whether any training-only package was imported. Run it
+from the directory that holds recommender_config.ini, as for app.py.
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Packages only the training / ETL process should load
+TRAINING_PACKAGES = ('lightfm', 'pandas', 'sqlalchemy', 'scipy', 'sklearn')
+
+SERVING_CODE = """
+import json, sys, time
+start = time.perf_counter()
+from voizy.api.server import create_app
+create_app()
+model_path = {model_path!r}
+if model_path:
+    from voizy.recommender.artifact import read_artifact
+    from voizy.recommender.scoring import ScoringEngine
+    arrays = read_artifact(model_path).arrays
+    ScoringEngine(arrays['user_biases'], arrays['user_embeddings'], arrays['item_biases'],
+                  arrays['item_embeddings'], arrays['post_ids'])
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [p for p in {packages!r} if p in sys.modules]}}))
+"""
+
+TRAINING_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import voizy.recommender.engine, voizy.recommender.features, lightfm
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [p for p in {packages!r} if p in sys.modules]}}))
+"""
+
+
+def run(code: str) -> dict:
+    """Run code in a fresh interpreter and parse its JSON result"""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True, text=True, env=env, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Main function to run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model-path', help="Model artifact directory to load (optional)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--target', type=float, default=1.0, help="Maximum median serving start-up in seconds")
+    args = parser.parse_args()
+
+    serving = [
+        run(SERVING_CODE.format(model_path=args.model_path, packages=TRAINING_PACKAGES))
+        for _ in range(args.repeat)
+    ]
+    training = [run(TRAINING_CODE.format(packages=TRAINING_PACKAGES)) for _ in range(args.repeat)]
+
+    serving_seconds = statistics.median(r['seconds'] for r in serving)
+    training_seconds = statistics.median(r['seconds'] for r in training)
+    loaded = sorted({p for r in serving for p in r['loaded']})
+
+    logger.info(f"serving start-up: {serving_seconds:.3f}s (median of {args.repeat})")
+    logger.info(f"training stack import: {training_seconds:.3f}s (median of {args.repeat})")
+
+    if loaded:
+        logger.error(f"Serving imported training-only packages: {', '.join(loaded)}")
+        return 1
+
+    if serving_seconds > args.target:
+        logger.error(f"Serving start-up above the {args.target:.1f}s target")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Benchmark LightFM training throughput against thread count.
+
+Trains on synthetic interactions and features, shaped like the training
+queries, with each requested thread count and reports epochs per second,
+the speedup over the first thread count and the time of the precision@k
+evaluation pass.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from voizy.recommender.engine import VoizyRecommender
+from benchmark_features import synthetic_frames
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def synthetic_interactions(n_users: int, n_posts: int, n_interactions: int, seed: int = 0) -> pd.DataFrame:
+    """Build an interactions DataFrame with a long-tailed post popularity"""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, n_posts + 1) ** 0.8
+
+    return pd.DataFrame({
+        'user_id': rng.integers(0, n_users, n_interactions),
+        'post_id': rng.choice(n_posts, n_interactions, p=popularity / popularity.sum()),
+        'interaction_strength': rng.choice([1, 3, 4, 5], n_interactions).astype(np.float32),
+        'timestamp': datetime.now() - timedelta(days=1)
+    })
+
+
+def main():
+    """Main function to run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--posts', type=int, default=100_000)
+    parser.add_argument('--interactions', type=int, default=2_000_000)
+    parser.add_argument('--epochs', type=int, default=3, help="Timed epochs per thread count")
+    parser.add_argument('--threads', type=int, nargs='+',
+                        default=sorted({1, 2, 4, 8, 16, 32, os.cpu_count() or 1}))
+    parser.add_argument('--loss', default='warp')
+    parser.add_argument('--max-sampled', type=int, default=10)
+    parser.add_argument('--no-features', action='store_true', help="Train on identity features only")
+    args = parser.parse_args()
+
+    from lightfm import LightFM
+    from lightfm.evaluation import precision_at_k
+
+    interactions_df = synthetic_interactions(args.users, args.posts, args.interactions)
+    user_features_df, post_features_df = (None, None) if args.no_features else synthetic_frames(args.users, args.posts)
+
+    recommender = VoizyRecommender({}, connect=False)
+    interactions, user_features, post_features = recommender.prepare_data(
+        interactions_df, user_features_df, post_features_df
+    )
+    logger.info(
+        f"{interactions.shape[0]} users x {interactions.shape[1]} posts, {interactions.nnz} interactions"
+    )
+
+    baseline = None
+    for num_threads in args.threads:
+        model = LightFM(no_components=30, learning_rate=0.05, loss=args.loss,
+                        max_sampled=args.max_sampled, random_state=42)
+
+        start = time.perf_counter()
+        for _ in range(args.epochs):
+            model.fit_partial(interactions, user_features=user_features, item_features=post_features,
+                              epochs=1, num_threads=num_threads)
+        epochs_per_second = args.epochs / (time.perf_counter() - start)
+        baseline = baseline or epochs_per_second
+
+        start = time.perf_counter()
+        precision_at_k(model, interactions, user_features=user_features, item_features=post_features,
+                       k=5, num_threads=num_threads)
+        evaluate_seconds = time.perf_counter() - start
+
+        logger.info(
+            f"threads={num_threads:3d}: {epochs_per_second:.3f} epochs/s "
+            f"({epochs_per_second / baseline:.1f}x), precision@5 pass {evaluate_seconds:.2f}s"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
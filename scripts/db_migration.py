@@ -134,6 +134,31 @@ def create_additional_tables():
         )
         """)
 
+        logger.info("Creating user_post_interactions table")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_post_interactions (
+            user_id BIGINT NOT NULL,
+            post_id BIGINT NOT NULL,
+            interaction_date DATE NOT NULL,
+            interaction_strength INT UNSIGNED NOT NULL,  -- summed event weights
+            interaction_count INT UNSIGNED NOT NULL,     -- number of events
+            first_interaction_at DATETIME NOT NULL,
+            last_interaction_at DATETIME NOT NULL,
+            PRIMARY KEY (user_id, post_id, interaction_date),
+            INDEX idx_user_post_interactions_date (interaction_date),
+            INDEX idx_user_post_interactions_post (post_id, interaction_date)
+        )
+        """)
+
+        logger.info("Creating interaction_rollup_watermarks table")
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS interaction_rollup_watermarks (
+            source_table VARCHAR(64) PRIMARY KEY,
+            last_id BIGINT NOT NULL DEFAULT 0,  -- highest source ID rolled up
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """)
+
         conn.commit()
         logger.info("Database migration completed successfully")
 
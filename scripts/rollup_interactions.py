@@ -0,0 +1,75 @@
+"""
+Maintain the interactions rollup for the Voizy recommender system.
+
+Rolls the events added since the last run into the user_post_interactions
+table; schedule it (e.g. from cron every few minutes) or let each refresh do
+it with USE_INTERACTIONS_ROLLUP enabled. With --backfill DAYS the rollup is
+rebuilt from the last DAYS days of events instead.
+"""
+import sys
+import logging
+import argparse
+import configparser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from voizy.db.connection import get_db_connection
+from voizy.recommender.rollup import backfill_interactions_rollup, update_interactions_rollup
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Main function to update or backfill the rollup"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--config', default='../recommender_config.ini')
+    parser.add_argument('--backfill', type=int, metavar='DAYS',
+                        help="Rebuild the rollup from the last DAYS days of events")
+    parser.add_argument('--batch-size', type=int, default=100_000, help="Source rows per transaction")
+    parser.add_argument('--settle-seconds', type=int, default=60,
+                        help="Leave events younger than this for the next run")
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.read(args.config)
+
+    db_config = {
+        'host': config.get('DATABASE', 'HOST', fallback='localhost'),
+        'user': config.get('DATABASE', 'USER'),
+        'password': config.get('DATABASE', 'PASSWORD'),
+        'database': config.get('DATABASE', 'DATABASE', fallback='voizy_db')
+    }
+    retention_days = config.getint('RECOMMENDER', 'ROLLUP_RETENTION_DAYS', fallback=90)
+
+    conn = get_db_connection(db_config)
+    try:
+        if args.backfill:
+            backfill_interactions_rollup(
+                conn,
+                days=args.backfill,
+                batch_size=args.batch_size,
+                settle_seconds=args.settle_seconds
+            )
+        else:
+            update_interactions_rollup(
+                conn,
+                batch_size=args.batch_size,
+                retention_days=retention_days,
+                settle_seconds=args.settle_seconds
+            )
+    except Exception as e:
+        logger.error(f"Error updating interactions rollup: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,7 +11,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from voizy.recommender.engine import VoizyRecommender
 from voizy.recommender.data import (
-    fetch_interactions_data,
+    fetch_interaction_arrays,
     fetch_user_features,
     fetch_post_features
 )
@@ -38,9 +38,20 @@ def main():
         'host': config.get('DATABASE', 'HOST', fallback='localhost'),
         'user': config.get('DATABASE', 'USER'),
         'password': config.get('DATABASE', 'PASSWORD'),
-        'database': config.get('DATABASE', 'DATABASE', fallback='voizy_db')
+        'database': config.get('DATABASE', 'DATABASE', fallback='voizy_db'),
+        'pool_size': config.getint('DATABASE', 'POOL_SIZE', fallback=8)
     }
 
+    training_config = {
+        'epochs': config.getint('TRAINING', 'EPOCHS', fallback=20),
+        'num_threads': config.getint('TRAINING', 'NUM_THREADS', fallback=0) or os.cpu_count() or 1,
+        'loss': config.get('TRAINING', 'LOSS', fallback='warp'),
+        'max_sampled': config.getint('TRAINING', 'MAX_SAMPLED', fallback=10),
+        'validation_users': config.getint('TRAINING', 'VALIDATION_USERS', fallback=2000),
+        'patience': config.getint('TRAINING', 'EARLY_STOPPING_PATIENCE', fallback=2)
+    }
+    validation_fraction = config.getfloat('TRAINING', 'VALIDATION_FRACTION', fallback=0.1)
+
     # model_path = config.get('RECOMMENDER', 'MODEL_PATH', fallback='../models/voizy_recommender')
     model_path = '../models/voizy_recommender'
 
@@ -50,17 +61,26 @@ def main():
         recommender = VoizyRecommender(db_config)
 
         logger.info("Fetching interaction data...")
-        interactions_df = fetch_interactions_data(recommender.conn, db_config, days_limit=30)
+        interactions = fetch_interaction_arrays(
+            db_config,
+            days_limit=30,
+            chunksize=100_000,
+            with_timestamps=validation_fraction > 0,
+            aggregate=config.getboolean('TRAINING', 'AGGREGATE_INTERACTIONS', fallback=True)
+        )
 
         logger.info("Fetching user features...")
-        user_features_df = fetch_user_features(recommender.conn, db_config)
+        user_features_df = fetch_user_features(db_config)
 
         logger.info("Fetching post features...")
-        post_features_df = fetch_post_features(recommender.conn, db_config, days_limit=60)
+        post_features_df = fetch_post_features(db_config, days_limit=60)
 
         logger.info("Preparing data for model training...")
         interactions_matrix, user_features_matrix, post_features_matrix = recommender.prepare_data(
-            interactions_df, user_features_df, post_features_df
+            interactions, user_features_df, post_features_df
+        )
+        interactions_matrix, validation_matrix = recommender.split_validation(
+            interactions, validation_fraction, interactions_matrix
         )
 
         logger.info("Training model...")
@@ -70,7 +90,8 @@ def main():
             post_features_matrix,
             num_components=30,
             learning_rate=0.05,
-            epochs=20
+            validation_matrix=validation_matrix,
+            **training_config
         )
 
         logger.info(f"Saving model to {model_path}...")
@@ -0,0 +1,152 @@
+"""
+Recommendation cache for the Voizy recommender API.
+
+This module provides a bounded, thread-safe LRU cache with per-entry TTL
+and a per-user key index, so invalidating one user's entries does not
+depend on the size of the cache.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationCache:
+    """
+    LRU + TTL cache keyed by arbitrary hashable keys and grouped by user.
+
+    Entries expire ttl seconds after they are stored. When the cache holds
+    max_entries entries, storing a new one evicts the least recently used.
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl: float = 60 * 60):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of entries held at once
+            ttl: Seconds an entry stays valid after it is stored
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._user_keys: Dict[int, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry and its user index reference (lock must be held)"""
+        _, user_id, _ = self._entries.pop(key)
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, user_id: int, ttl: Optional[float] = None) -> None:
+        """
+        Store a value
+
+        Args:
+            key: Cache key
+            value: Value to store
+            user_id: User the entry belongs to, for invalidation
+            ttl: Seconds the entry stays valid (optional, defaults to the cache TTL)
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (expires_at, user_id, value)
+            self._user_keys.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        Remove every entry belonging to a user
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = self._user_keys.pop(user_id, set())
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        """
+        Remove every entry
+        """
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with size, capacity and hit/miss/eviction counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
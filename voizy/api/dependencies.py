@@ -4,12 +4,17 @@ Shared dependencies for the Voizy recommender API.
 This module contains dependencies and shared resources used by both
 server.py and endpoints.py to avoid circular imports.
 """
+import os
 import logging
 import configparser
+import threading
 from typing import Dict, Any
 from datetime import datetime
 
 from voizy.recommender.engine import VoizyRecommender
+from voizy.api.cache import RecommendationCache
+from voizy.recommender.impressions import ImpressionWriter
+from voizy.recommender.utils import record_recommendation_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -20,18 +25,62 @@ db_config = {
     'host': config.get('DATABASE', 'HOST', fallback='localhost'),
     'user': config.get('DATABASE', 'USER'),
     'password': config.get('DATABASE', 'PASSWORD'),
-    'database': config.get('DATABASE', 'DATABASE', fallback='voizy_db')
+    'database': config.get('DATABASE', 'DATABASE', fallback='voizy_db'),
+    'pool_size': config.getint('DATABASE', 'POOL_SIZE', fallback=8)
 }
 
 recommender_config = {
     'model_path': config.get('RECOMMENDER', 'MODEL_PATH', fallback='./models/voizy_recommender'),
     'refresh_interval': config.getint('RECOMMENDER', 'REFRESH_INTERVAL', fallback=24 * 60 * 60),  # Default: 1 day
-    'recommendation_cache_ttl': config.getint('RECOMMENDER', 'CACHE_TTL', fallback=60 * 60)  # Default: 1 hour
+    'recommendation_cache_ttl': config.getint('RECOMMENDER', 'CACHE_TTL', fallback=60 * 60),  # Default: 1 hour
+    'recommendation_cache_max_entries': config.getint('RECOMMENDER', 'CACHE_MAX_ENTRIES', fallback=100_000),
+    'snapshot_ttl': config.getint('RECOMMENDER', 'SNAPSHOT_TTL', fallback=30 * 60),  # Default: 30 minutes
+    'snapshot_max_entries': config.getint('RECOMMENDER', 'SNAPSHOT_MAX_ENTRIES', fallback=100_000),
+    'ranked_list_depth': config.getint('RECOMMENDER', 'RANKED_LIST_DEPTH', fallback=500),
+    'fetch_chunk_size': config.getint('RECOMMENDER', 'FETCH_CHUNK_SIZE', fallback=100_000),
+    'impression_queue_size': config.getint('RECOMMENDER', 'IMPRESSION_QUEUE_SIZE', fallback=100_000),
+    'impression_batch_size': config.getint('RECOMMENDER', 'IMPRESSION_BATCH_SIZE', fallback=5000),
+    'impression_flush_interval': config.getfloat('RECOMMENDER', 'IMPRESSION_FLUSH_INTERVAL', fallback=1.0),
+    'seen_refresh_interval': config.getint('RECOMMENDER', 'SEEN_REFRESH_INTERVAL', fallback=60),  # Default: 1 minute
+    'ann_enabled': config.getboolean('RECOMMENDER', 'ANN_ENABLED', fallback=False),
+    'ann_n_lists': config.getint('RECOMMENDER', 'ANN_N_LISTS', fallback=0),  # Default: about sqrt(number of posts)
+    'ann_n_probe': config.getint('RECOMMENDER', 'ANN_N_PROBE', fallback=32),
+    'incremental_enabled': config.getboolean('RECOMMENDER', 'INCREMENTAL_ENABLED', fallback=False),
+    'incremental_epochs': config.getint('RECOMMENDER', 'INCREMENTAL_EPOCHS', fallback=3),
+    'full_retrain_interval': config.getint('RECOMMENDER', 'FULL_RETRAIN_INTERVAL', fallback=7 * 24 * 60 * 60),  # Default: 1 week
+    'use_interactions_rollup': config.getboolean('RECOMMENDER', 'USE_INTERACTIONS_ROLLUP', fallback=False),
+    'rollup_retention_days': config.getint('RECOMMENDER', 'ROLLUP_RETENTION_DAYS', fallback=90)
+}
+
+training_config = {
+    'aggregate_interactions': config.getboolean('TRAINING', 'AGGREGATE_INTERACTIONS', fallback=True),
+    'epochs': config.getint('TRAINING', 'EPOCHS', fallback=20),
+    # 0 uses every core of the training host
+    'num_threads': config.getint('TRAINING', 'NUM_THREADS', fallback=0) or os.cpu_count() or 1,
+    'loss': config.get('TRAINING', 'LOSS', fallback='warp'),
+    'max_sampled': config.getint('TRAINING', 'MAX_SAMPLED', fallback=10),
+    'validation_fraction': config.getfloat('TRAINING', 'VALIDATION_FRACTION', fallback=0.1),
+    'validation_users': config.getint('TRAINING', 'VALIDATION_USERS', fallback=2000),
+    'patience': config.getint('TRAINING', 'EARLY_STOPPING_PATIENCE', fallback=2)
+}
+
+api_config = {
+    'admin_key': config.get('API', 'ADMIN_KEY', fallback=None)
 }
 
 recommender = None
+impression_writer = None
+training_manager = None
 last_model_refresh = datetime.now()
-recommendation_cache = {}
+recommendation_cache = RecommendationCache(
+    max_entries=recommender_config['recommendation_cache_max_entries'],
+    ttl=recommender_config['recommendation_cache_ttl']
+)
+ranked_list_snapshots = RecommendationCache(
+    max_entries=recommender_config['snapshot_max_entries'],
+    ttl=recommender_config['snapshot_ttl']
+)
+_recommender_lock = threading.Lock()
 
 def get_recommender():
     """
@@ -39,14 +88,94 @@ def get_recommender():
     """
     global recommender
     if recommender is None:
-        recommender = VoizyRecommender(db_config, model_path=recommender_config['model_path'])
+        with _recommender_lock:
+            if recommender is None:
+                ann_params = None
+                if recommender_config['ann_enabled']:
+                    ann_params = {
+                        'n_lists': recommender_config['ann_n_lists'],
+                        'n_probe': recommender_config['ann_n_probe']
+                    }
+
+                recommender = VoizyRecommender(
+                    db_config,
+                    model_path=recommender_config['model_path'],
+                    ann_params=ann_params,
+                    ranked_list_depth=recommender_config['ranked_list_depth'],
+                    use_rollup=recommender_config['use_interactions_rollup']
+                )
     return recommender
 
+def get_impression_writer():
+    """
+    Dependency to get the impression writer, sharing the recommender's connection pool
+    """
+    global impression_writer
+    if impression_writer is None:
+        db_pool = get_recommender().db_pool
+        with _recommender_lock:
+            if impression_writer is None:
+                impression_writer = ImpressionWriter(
+                    db_pool,
+                    max_queue_size=recommender_config['impression_queue_size'],
+                    max_batch_size=recommender_config['impression_batch_size'],
+                    flush_interval=recommender_config['impression_flush_interval']
+                )
+    return impression_writer
+
+def _on_model_refreshed(result: Dict[str, Any]) -> None:
+    """
+    Drop cached recommendations and record the new model after a successful refresh
+    """
+    recommendation_cache.clear()
+
+    try:
+        with get_recommender().db_pool.connection() as conn:
+            record_recommendation_metrics(
+                conn,
+                "model_training_completed",
+                1.0,
+                {
+                    "timestamp": datetime.now().isoformat(),
+                    "model_version": result['model_version'],
+                    "num_users": result['num_users'],
+                    "num_posts": result['num_posts']
+                }
+            )
+    except Exception as e:
+        logger.error(f"Error recording model refresh metrics: {e}")
+
+def get_training_manager():
+    """
+    Dependency to get the single-flight training job manager
+    """
+    global training_manager
+    if training_manager is None:
+        with _recommender_lock:
+            if training_manager is None:
+                from voizy.recommender.training import TrainingJobManager
+                training_manager = TrainingJobManager(
+                    get_recommender,
+                    db_config,
+                    recommender_config['model_path'],
+                    on_success=_on_model_refreshed,
+                    chunksize=recommender_config['fetch_chunk_size'],
+                    incremental=recommender_config['incremental_enabled'],
+                    incremental_epochs=recommender_config['incremental_epochs'],
+                    full_retrain_interval=recommender_config['full_retrain_interval'],
+                    use_rollup=recommender_config['use_interactions_rollup'],
+                    rollup_retention_days=recommender_config['rollup_retention_days'],
+                    **training_config
+                )
+    return training_manager
+
 def get_config():
     """
     Dependency to get the configuration
     """
     return {
         'db_config': db_config,
-        'recommender_config': recommender_config
+        'recommender_config': recommender_config,
+        'training_config': training_config,
+        'api_config': api_config
     }
\ No newline at end of file
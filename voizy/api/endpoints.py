@@ -3,25 +3,27 @@ API endpoints for the Voizy recommender system.
 """
 import logging
 import json
-from typing import List, Dict, Any, Optional
+import base64
+import binascii
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from fastapi import APIRouter, Query, Depends, HTTPException, Header, Body
 from pydantic import BaseModel, Field
-import threading
 
 from voizy.recommender.engine import VoizyRecommender
+from voizy.recommender.impressions import ImpressionWriter
+from voizy.recommender.training import TrainingJobManager
 from voizy.api.dependencies import (
     get_recommender,
+    get_impression_writer,
+    get_training_manager,
     get_config,
     recommendation_cache,
+    ranked_list_snapshots,
     recommender_config
 )
-from voizy.recommender.data import (
-    fetch_interactions_data,
-    fetch_user_features,
-    fetch_post_features,
-    get_popular_posts
-)
+from voizy.recommender.lookups import get_popular_posts
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +37,22 @@ class Recommendation(BaseModel):
 
 class RecommendationResponse(BaseModel):
     recommendations: List[Recommendation]
+    next_cursor: Optional[str] = None
+
+
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=1000, description="User IDs")
+    limit: int = Field(10, ge=1, le=100, description="Number of recommendations to return per user")
+    exclude_seen: bool = Field(True, description="Whether to exclude already seen posts")
+
+
+class UserRecommendations(BaseModel):
+    user_id: int
+    recommendations: List[Recommendation]
+
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[UserRecommendations]
 
 
 class PostIdList(BaseModel):
@@ -52,55 +70,154 @@ class SuccessResponse(BaseModel):
     message: str = ""
 
 
+class TrainingStage(BaseModel):
+    name: str
+    started_at: datetime
+    duration_seconds: Optional[float] = None
+
+
+class RefreshStatusResponse(BaseModel):
+    state: str
+    job_id: Optional[str] = None
+    trigger: Optional[str] = None
+    stage: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    stages: List[TrainingStage] = []
+    coalesced_requests: int = 0
+    error: Optional[str] = None
+    last_success_at: Optional[datetime] = None
+    last_model_version: Optional[str] = None
+    last_training_mode: Optional[str] = None
+    last_error: Optional[str] = None
+
+
+class CacheStatsResponse(BaseModel):
+    size: int
+    max_entries: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
+    invalidations: int
+
+
+def _encode_cursor(user_id: int, snapshot_id: str, offset: int, exclude_seen: bool) -> str:
+    """
+    Encode a paging position as an opaque cursor string
+    """
+    payload = json.dumps({'u': user_id, 's': snapshot_id, 'o': offset, 'x': exclude_seen}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, str, int, bool]:
+    """
+    Decode a cursor string into (user ID, snapshot ID, offset, exclude_seen)
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return int(payload['u']), str(payload['s']), int(payload['o']), bool(payload['x'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/api/recommendations", response_model=RecommendationResponse, tags=["recommendations"])
-async def get_recommendations(
+def get_recommendations(
         user_id: int = Query(..., description="User ID"),
         limit: int = Query(10, ge=1, le=100, description="Number of recommendations to return"),
         exclude_seen: bool = Query(True, description="Whether to exclude already seen posts"),
+        cursor: Optional[str] = Query(None, description="Cursor from a previous response to fetch the next page"),
         recommender: VoizyRecommender = Depends(get_recommender),
+        impression_writer: ImpressionWriter = Depends(get_impression_writer),
         config_dict: Dict[str, Any] = Depends(get_config)
 ):
     """
     Get personalized post recommendations for a user.
+
+    The response carries a next_cursor while more posts are available.
+    Passing it back returns the next page from the same ranked snapshot,
+    without rescoring; exclude_seen is taken from the cursor.
     """
     try:
-        cache_key = f"{user_id}_{limit}_{exclude_seen}"
-        current_time = datetime.now()
-
-        if cache_key in recommendation_cache:
-            cache_time, cached_recommendations = recommendation_cache[cache_key]
-            seconds_since_cache = (current_time - cache_time).total_seconds()
-
-            if seconds_since_cache < config_dict['recommender_config']['recommendation_cache_ttl']:
+        if cursor is not None:
+            cursor_user_id, snapshot_id, offset, exclude_seen = _decode_cursor(cursor)
+            if cursor_user_id != user_id:
+                raise HTTPException(status_code=400, detail="Cursor was issued to another user")
+
+            # Keyed by owner too, so a snapshot is only ever served to the user it was ranked for
+            ranked_list = ranked_list_snapshots.get((user_id, snapshot_id))
+            if ranked_list is None:
+                raise HTTPException(status_code=410, detail="Cursor expired")
+        else:
+            offset = 0
+            snapshot_id = uuid.uuid4().hex
+
+            ranked_list = recommendation_cache.get((user_id, recommender.model_version))
+            if ranked_list is not None:
                 logger.info(f"Returned cached recommendations for user {user_id}")
-                return {"recommendations": cached_recommendations}
+            else:
+                ranked_list = recommender.get_ranked_candidates(user_id)
+                recommendation_cache.set((user_id, ranked_list.model_version), ranked_list, user_id=user_id)
 
-        recommendations = recommender.get_recommendations(user_id, n=limit, exclude_seen=exclude_seen)
+            ranked_list_snapshots.set((user_id, snapshot_id), ranked_list, user_id=user_id)
 
         formatted_recommendations = [
             Recommendation(post_id=rec['post_id'], score=rec['score'])
-            for rec in recommendations
+            for rec in ranked_list.top(limit, exclude_seen=exclude_seen, offset=offset)
         ]
 
-        recommendation_cache[cache_key] = (current_time, formatted_recommendations)
+        next_cursor = None
+        if offset + limit < ranked_list.count(exclude_seen=exclude_seen):
+            next_cursor = _encode_cursor(user_id, snapshot_id, offset + limit, exclude_seen)
 
-        try:
-            recommender.update_analytics_after_recommendation(
-                user_id,
-                [rec.post_id for rec in formatted_recommendations[:5]]
-            )
-        except Exception as e:
-            logger.error(f"Error updating analytics: {e}")
+        impression_writer.enqueue(user_id, [rec.post_id for rec in formatted_recommendations[:5]])
 
-        return {"recommendations": formatted_recommendations}
+        return {"recommendations": formatted_recommendations, "next_cursor": next_cursor}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating recommendations: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/api/recommendations/batch", response_model=BatchRecommendationResponse, tags=["recommendations"])
+def get_batch_recommendations(
+        request: BatchRecommendationRequest,
+        recommender: VoizyRecommender = Depends(get_recommender)
+):
+    """
+    Get personalized post recommendations for many users in one call.
+
+    Intended for feed prefetch: results are written to the recommendation
+    cache so the following /api/recommendations call for each user is a hit.
+    """
+    try:
+        ranked_lists = recommender.get_batch_ranked_candidates(request.user_ids)
+
+        results = []
+        for user_id in dict.fromkeys(request.user_ids):
+            ranked_list = ranked_lists[user_id]
+            recommendation_cache.set((user_id, ranked_list.model_version), ranked_list, user_id=user_id)
+
+            formatted_recommendations = [
+                Recommendation(post_id=rec['post_id'], score=rec['score'])
+                for rec in ranked_list.top(request.limit, exclude_seen=request.exclude_seen)
+            ]
+            results.append(UserRecommendations(user_id=user_id, recommendations=formatted_recommendations))
+
+        logger.info(f"Generated batch recommendations for {len(results)} users")
+
+        return {"results": results}
+
+    except Exception as e:
+        logger.error(f"Error generating batch recommendations: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/api/popular", response_model=PostIdList, tags=["recommendations"])
-async def get_popular_posts_endpoint(
+def get_popular_posts_endpoint(
         limit: int = Query(10, ge=1, le=100, description="Number of posts to return"),
         days: int = Query(7, ge=1, le=30, description="Limit to posts from the last N days"),
         recommender: VoizyRecommender = Depends(get_recommender)
@@ -109,7 +226,8 @@ async def get_popular_posts_endpoint(
     Get popular posts from the last N days.
     """
     try:
-        popular_posts = get_popular_posts(recommender.conn, n=limit, days_limit=days)
+        with recommender.db_pool.connection() as conn:
+            popular_posts = get_popular_posts(conn, n=limit, days_limit=days, use_rollup=recommender.use_rollup)
 
         return {"post_ids": popular_posts}
     except Exception as e:
@@ -118,7 +236,7 @@ async def get_popular_posts_endpoint(
 
 
 @router.post("/api/feedback", response_model=SuccessResponse, tags=["feedback"])
-async def record_feedback(
+def record_feedback(
         feedback: FeedbackRequest,
         recommender: VoizyRecommender = Depends(get_recommender)
 ):
@@ -126,36 +244,37 @@ async def record_feedback(
     Record explicit user feedback for recommendations.
     """
     try:
-        cursor = recommender.conn.cursor()
-        query = """
-        INSERT INTO analytics_events 
-        (user_id, event_type, object_type, object_id, event_time, meta_data)
-        VALUES (%s, %s, 'post', %s, NOW(), %s)
-        """
+        with recommender.db_pool.connection() as conn:
+            cursor = conn.cursor()
+            query = """
+            INSERT INTO analytics_events 
+            (user_id, event_type, object_type, object_id, event_time, meta_data)
+            VALUES (%s, %s, 'post', %s, NOW(), %s)
+            """
 
-        event_type = f"recommendation_{feedback.feedback_type}"
-        meta_data = json.dumps({'source': 'recommender_system'})
+            event_type = f"recommendation_{feedback.feedback_type}"
+            meta_data = json.dumps({'source': 'recommender_system'})
 
-        cursor.execute(query, (feedback.user_id, event_type, feedback.post_id, meta_data))
+            cursor.execute(query, (feedback.user_id, event_type, feedback.post_id, meta_data))
 
-        query = """
-        UPDATE user_recommendations
-        SET is_interacted = 1,
-            interaction_type = %s,
-            interaction_time = NOW()
-        WHERE user_id = %s
-          AND post_id = %s
-          AND is_interacted = 0
-        """
+            query = """
+            UPDATE user_recommendations
+            SET is_interacted = 1,
+                interaction_type = %s,
+                interaction_time = NOW()
+            WHERE user_id = %s
+              AND post_id = %s
+              AND is_interacted = 0
+            """
 
-        cursor.execute(query, (feedback.feedback_type, feedback.user_id, feedback.post_id))
+            cursor.execute(query, (feedback.feedback_type, feedback.user_id, feedback.post_id))
 
-        recommender.conn.commit()
-        cursor.close()
+            conn.commit()
+            cursor.close()
 
-        for key in list(recommendation_cache.keys()):
-            if key.startswith(f"{feedback.user_id}_"):
-                del recommendation_cache[key]
+        recommender.record_seen(feedback.user_id, [feedback.post_id])
+
+        recommendation_cache.invalidate_user(feedback.user_id)
 
         return {"success": True, "message": "Feedback recorded successfully"}
     except Exception as e:
@@ -163,73 +282,44 @@ async def record_feedback(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/api/cache/stats", response_model=CacheStatsResponse, tags=["admin"])
+def get_cache_stats():
+    """
+    Get recommendation cache size and hit/miss/eviction counters.
+    """
+    return recommendation_cache.stats()
+
+
 @router.post("/api/refresh", response_model=SuccessResponse, tags=["admin"])
-async def trigger_refresh(
-        recommender: VoizyRecommender = Depends(get_recommender),
+def trigger_refresh(
         config_dict: Dict[str, Any] = Depends(get_config),
+        training_manager: TrainingJobManager = Depends(get_training_manager),
         x_api_key: Optional[str] = Header(None)
 ):
     """
     Manually trigger model refresh (protected by API key).
+
+    Only one refresh runs at a time; a request made while one is running
+    joins it instead of starting another.
     """
-    expected_key = config_dict.get('recommender_config', {}).get('ADMIN_KEY')
+    expected_key = config_dict.get('api_config', {}).get('admin_key')
 
     if not x_api_key or x_api_key != expected_key:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
-    refresh_thread = threading.Thread(
-        target=refresh_model_now,
-        args=(recommender, config_dict),
-        daemon=True
-    )
-    refresh_thread.start()
+    if not training_manager.start(trigger="manual"):
+        return {"success": True, "message": "Model refresh already running"}
 
     return {"success": True, "message": "Model refresh started"}
 
 
-def refresh_model_now(recommender: VoizyRecommender, config_dict: Dict[str, Any]):
-    """
-    Refresh the model immediately
+@router.get("/api/refresh/status", response_model=RefreshStatusResponse, tags=["admin"])
+def get_refresh_status(training_manager: TrainingJobManager = Depends(get_training_manager)):
     """
-    logger.info("Starting manual model refresh...")
+    Get the state of the current or last model refresh.
 
-    try:
-        db_config = config_dict['db_config']
-
-        interactions_df = fetch_interactions_data(
-            recommender.conn,
-            db_config,
-            days_limit=30
-        )
-
-        user_features_df = fetch_user_features(
-            recommender.conn,
-            db_config
-        )
-
-        post_features_df = fetch_post_features(
-            recommender.conn,
-            db_config,
-            days_limit=60
-        )
-
-        interactions_matrix, user_features_matrix, post_features_matrix = recommender.prepare_data(
-            interactions_df, user_features_df, post_features_df
-        )
-
-        recommender.train_model(
-            interactions_matrix,
-            user_features_matrix,
-            post_features_matrix,
-            num_components=30,
-            learning_rate=0.05,
-            epochs=20
-        )
-
-        recommender.save_model(config_dict['recommender_config']['model_path'])
-
-        recommendation_cache.clear()
-
-        logger.info("Manual model refresh completed successfully")
-    except Exception as e:
-        logger.error(f"Error during manual model refresh: {e}")
\ No newline at end of file
+    Stages are timed separately: rollup (when enabled), fetch, prepare,
+    fit epoch N/M and, with a validation split, evaluate epoch N/M, then
+    fit validation interactions, save and load.
+    """
+    return training_manager.status()
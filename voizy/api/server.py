@@ -10,19 +10,13 @@ import datetime
 
 from voizy.api.dependencies import (
     get_recommender,
+    get_impression_writer,
+    get_training_manager,
     get_config,
     recommender_config,
-    db_config,
-    recommender,
-    last_model_refresh,
-    recommendation_cache
+    last_model_refresh
 )
-from voizy.recommender.data import (
-    fetch_interactions_data,
-    fetch_user_features,
-    fetch_post_features
-)
-from voizy.recommender.utils import record_recommendation_metrics
+from voizy.db.connection import dispose_sqlalchemy_engine
 
 logger = logging.getLogger(__name__)
 
@@ -64,85 +58,56 @@ def create_app() -> FastAPI:
         refresh_thread.start()
         logger.info("Started background model refresh thread")
 
+        seen_items_thread = threading.Thread(
+            target=refresh_seen_items_periodically,
+            daemon=True
+        )
+        seen_items_thread.start()
+        logger.info("Started background seen-items refresh thread")
+
+        get_impression_writer().start()
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        get_impression_writer().stop()
+        dispose_sqlalchemy_engine()
+
     return app
 
 
 def refresh_model_periodically():
     """
     Background thread to refresh the model periodically
-    """
-    global last_model_refresh, recommender, recommendation_cache
 
+    Scheduled refreshes go through the training job manager, so they never
+    overlap with a manual refresh.
+    """
     while True:
         try:
-            current_time = datetime.datetime.now()
-
-            if last_model_refresh is None:
-                last_model_refresh = current_time
-                logger.info("Initialized last_model_refresh timestamp")
+            training_manager = get_training_manager()
+            last_refresh = training_manager.last_success_at or last_model_refresh
 
-            seconds_since_refresh = (current_time - last_model_refresh).total_seconds()
+            seconds_since_refresh = (datetime.datetime.now() - last_refresh).total_seconds()
 
             if seconds_since_refresh >= recommender_config['refresh_interval']:
                 logger.info("Starting scheduled model refresh...")
-
-                if recommender is None:
-                    recommender = get_recommender()
-
-                training_recommender = get_recommender()
-
-                interactions_df = fetch_interactions_data(
-                    training_recommender.conn,
-                    db_config,
-                    days_limit=30
-                )
-
-                user_features_df = fetch_user_features(
-                    training_recommender.conn,
-                    db_config
-                )
-
-                post_features_df = fetch_post_features(
-                    training_recommender.conn,
-                    db_config,
-                    days_limit=60
-                )
-
-                interactions_matrix, user_features_matrix, post_features_matrix = training_recommender.prepare_data(
-                    interactions_df, user_features_df, post_features_df
-                )
-
-                training_recommender.train_model(
-                    interactions_matrix,
-                    user_features_matrix,
-                    post_features_matrix,
-                    num_components=30,
-                    learning_rate=0.05,
-                    epochs=20
-                )
-
-                training_recommender.save_model(recommender_config['model_path'])
-
-                recommender = training_recommender
-
-                recommendation_cache.clear()
-
-                last_model_refresh = datetime.datetime.now()
-                logger.info("Model refresh completed successfully")
-
-                record_recommendation_metrics(
-                    recommender.conn,
-                    "model_training_completed",
-                    1.0,
-                    {
-                        "timestamp": last_model_refresh.isoformat(),
-                        "num_users": len(recommender.user_mapping),
-                        "num_posts": len(recommender.post_mapping)
-                    }
-                )
+                training_manager.start(trigger="scheduled")
 
         except Exception as e:
             logger.error(f"Error during model refresh: {e}")
 
         # Sleep for a while before checking again
-        time.sleep(60 * 10)  # Check every 10 minutes
\ No newline at end of file
+        time.sleep(60 * 10)  # Check every 10 minutes
+
+
+def refresh_seen_items_periodically():
+    """
+    Background thread to merge new interactions into the seen-items index
+    """
+    while True:
+        time.sleep(recommender_config['seen_refresh_interval'])
+
+        try:
+            get_recommender().update_seen_items()
+        except Exception as e:
+            logger.error(f"Error updating seen items: {e}")
@@ -2,11 +2,20 @@
 Database connection utilities for Voizy recommender system.
 """
 import logging
-from typing import Dict, Any
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Any, Iterator, Optional
 import mysql.connector
+from mysql.connector import pooling
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
 
 logger = logging.getLogger(__name__)
 
+_sqlalchemy_engine = None
+_sqlalchemy_engine_lock = threading.Lock()
+
 
 def get_db_connection(db_config: Dict[str, Any]):
     """
@@ -28,4 +37,136 @@ def get_db_connection(db_config: Dict[str, Any]):
         return conn
     except mysql.connector.Error as err:
         logger.error(f"Failed to connect to database: {err}")
-        raise
\ No newline at end of file
+        raise
+
+
+class DatabasePool:
+    """
+    Thread-safe pool of MySQL connections.
+
+    Connections are checked out with the connection() context manager, which
+    waits for a free connection instead of failing when the pool is busy,
+    pings it (reconnecting if the server dropped it), rolls back on error and
+    returns it to the pool afterwards.
+    """
+
+    def __init__(
+            self,
+            db_config: Dict[str, Any],
+            pool_size: int = 8,
+            pool_name: str = "voizy_pool",
+            checkout_timeout: Optional[float] = 30.0
+    ):
+        """
+        Initialize the connection pool
+
+        Args:
+            db_config: Database configuration parameters
+            pool_size: Number of pooled connections (at most 32)
+            pool_name: Name of the pool
+            checkout_timeout: Seconds to wait for a free connection (None waits forever)
+        """
+        if not 1 <= pool_size <= pooling.CNX_POOL_MAXSIZE:
+            raise ValueError(f"pool_size must be between 1 and {pooling.CNX_POOL_MAXSIZE}, got {pool_size}")
+
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self._available = threading.BoundedSemaphore(pool_size)
+
+        try:
+            self._pool = pooling.MySQLConnectionPool(
+                pool_name=pool_name,
+                pool_size=pool_size,
+                pool_reset_session=True,
+                host=db_config['host'],
+                user=db_config['user'],
+                password=db_config['password'],
+                database=db_config['database']
+            )
+        except mysql.connector.Error as err:
+            logger.error(f"Failed to create connection pool: {err}")
+            raise
+
+        logger.info(f"Created database connection pool '{pool_name}' with {pool_size} connections")
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Check out a healthy connection from the pool
+
+        Yields:
+            MySQL connection, returned to the pool when the block exits
+        """
+        if not self._available.acquire(timeout=self.checkout_timeout):
+            raise pooling.PoolError(f"Timed out after {self.checkout_timeout}s waiting for a database connection")
+
+        try:
+            conn = self._pool.get_connection()
+            try:
+                # Reconnect connections the server closed while they sat idle
+                conn.ping(reconnect=True, attempts=3, delay=1)
+
+                yield conn
+            except Exception:
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    pass
+                raise
+            finally:
+                conn.close()
+        finally:
+            self._available.release()
+
+
+def get_sqlalchemy_engine(db_config: Dict[str, Any]) -> 'Engine':
+    """
+    Get the process-wide SQLAlchemy engine used for bulk pandas reads
+
+    The engine is created on first use and reused afterwards, so its
+    connection pool is shared by every refresh instead of being rebuilt
+    (and leaked) per query. It uses the PyMySQL driver, which supports
+    server-side cursors for streaming large result sets.
+
+    Args:
+        db_config: Database configuration parameters
+
+    Returns:
+        SQLAlchemy engine
+    """
+    global _sqlalchemy_engine
+    if _sqlalchemy_engine is None:
+        with _sqlalchemy_engine_lock:
+            if _sqlalchemy_engine is None:
+                # Only refresh/training reads through SQLAlchemy; keep it out of serving imports
+                from sqlalchemy import create_engine
+                from sqlalchemy.engine import URL
+
+                url = URL.create(
+                    "mysql+pymysql",
+                    username=db_config['user'],
+                    password=db_config['password'],
+                    host=db_config['host'],
+                    database=db_config['database']
+                )
+                _sqlalchemy_engine = create_engine(
+                    url,
+                    pool_size=2,
+                    max_overflow=2,
+                    pool_pre_ping=True,
+                    pool_recycle=3600
+                )
+                logger.info("Created shared SQLAlchemy engine")
+    return _sqlalchemy_engine
+
+
+def dispose_sqlalchemy_engine() -> None:
+    """
+    Close all connections held by the shared SQLAlchemy engine
+    """
+    global _sqlalchemy_engine
+    with _sqlalchemy_engine_lock:
+        if _sqlalchemy_engine is not None:
+            _sqlalchemy_engine.dispose()
+            _sqlalchemy_engine = None
+            logger.info("Disposed shared SQLAlchemy engine")
@@ -52,6 +52,81 @@ FROM post_shares
 WHERE shared_at > '{cutoff_date}'
 """
 
+# Same events as INTERACTIONS_QUERY without the interaction_type label, for
+# streaming into numeric arrays
+INTERACTION_EVENTS_QUERY = """
+SELECT user_id, object_id AS post_id, 1 AS interaction_strength, event_time AS timestamp
+FROM analytics_events
+WHERE event_type = 'post_view'
+  AND object_type = 'post'
+  AND event_time > '{cutoff_date}'
+
+UNION ALL
+
+SELECT user_id, post_id, 3 AS interaction_strength, reacted_at AS timestamp
+FROM post_reactions
+WHERE reacted_at > '{cutoff_date}'
+
+UNION ALL
+
+SELECT user_id, post_id, 4 AS interaction_strength, created_at AS timestamp
+FROM comments
+WHERE created_at > '{cutoff_date}'
+
+UNION ALL
+
+SELECT user_id, post_id, 5 AS interaction_strength, shared_at AS timestamp
+FROM post_shares
+WHERE shared_at > '{cutoff_date}'
+"""
+
+# One row per (user_id, post_id) with the summed strength, the number of
+# events and the time of the last one. Each source is grouped on its own
+# first so the outer GROUP BY only merges at most four rows per pair.
+INTERACTIONS_AGGREGATED_QUERY = """
+SELECT
+    user_id,
+    post_id,
+    -- SUM returns DECIMAL, which drivers hand back as Python Decimal objects
+    CAST(SUM(interaction_strength) AS UNSIGNED) AS interaction_strength,
+    CAST(SUM(interaction_count) AS UNSIGNED) AS interaction_count,
+    MAX(last_interaction) AS timestamp,
+    MIN(first_interaction) AS first_interaction
+FROM (
+    SELECT user_id, object_id AS post_id, COUNT(*) * 1 AS interaction_strength,
+           COUNT(*) AS interaction_count, MAX(event_time) AS last_interaction,
+           MIN(event_time) AS first_interaction
+    FROM analytics_events
+    WHERE event_type = 'post_view'
+      AND object_type = 'post'
+      AND object_id IS NOT NULL
+      AND event_time > '{cutoff_date}'
+    GROUP BY user_id, object_id
+
+    UNION ALL
+
+    SELECT user_id, post_id, COUNT(*) * 3, COUNT(*), MAX(reacted_at), MIN(reacted_at)
+    FROM post_reactions
+    WHERE reacted_at > '{cutoff_date}'
+    GROUP BY user_id, post_id
+
+    UNION ALL
+
+    SELECT user_id, post_id, COUNT(*) * 4, COUNT(*), MAX(created_at), MIN(created_at)
+    FROM comments
+    WHERE created_at > '{cutoff_date}'
+    GROUP BY user_id, post_id
+
+    UNION ALL
+
+    SELECT user_id, post_id, COUNT(*) * 5, COUNT(*), MAX(shared_at), MIN(shared_at)
+    FROM post_shares
+    WHERE shared_at > '{cutoff_date}'
+    GROUP BY user_id, post_id
+) AS per_source
+GROUP BY user_id, post_id
+"""
+
 USER_FEATURES_QUERY = """
 -- Basic user info
 SELECT 
@@ -163,6 +238,37 @@ FROM post_shares
 WHERE user_id = %s
 """
 
+RECENT_INTERACTIONS_QUERY = """
+-- Post views since the watermark
+SELECT user_id, object_id AS post_id, event_time AS timestamp
+FROM analytics_events
+WHERE event_type = 'post_view'
+  AND object_type = 'post'
+  AND object_id IS NOT NULL
+  AND event_time >= %s
+
+UNION ALL
+
+-- Post reactions since the watermark
+SELECT user_id, post_id, reacted_at AS timestamp
+FROM post_reactions
+WHERE reacted_at >= %s
+
+UNION ALL
+
+-- Post comments since the watermark
+SELECT user_id, post_id, created_at AS timestamp
+FROM comments
+WHERE created_at >= %s
+
+UNION ALL
+
+-- Post shares since the watermark
+SELECT user_id, post_id, shared_at AS timestamp
+FROM post_shares
+WHERE shared_at >= %s
+"""
+
 POPULAR_POSTS_QUERY = """
 SELECT p.post_id,
        (p.views * 1 + 
@@ -177,4 +283,63 @@ WHERE p.created_at > '{cutoff_date}'
 GROUP BY p.post_id
 ORDER BY score DESC
 LIMIT {limit}
+"""
+
+# Rolls up one source table's events with IDs in (%s, %s] and times at or
+# after %s into user_post_interactions, one row per user, post and day.
+# Formatted with a RollupSource from voizy.recommender.rollup.
+ROLLUP_INSERT_QUERY = """
+INSERT INTO user_post_interactions
+    (user_id, post_id, interaction_date, interaction_strength, interaction_count,
+     first_interaction_at, last_interaction_at)
+SELECT
+    user_id,
+    {post_column},
+    DATE({time_column}),
+    COUNT(*) * {weight},
+    COUNT(*),
+    MIN({time_column}),
+    MAX({time_column})
+FROM {table}
+WHERE {id_column} > %s
+  AND {id_column} <= %s
+  AND {time_column} >= %s
+  {condition}
+GROUP BY user_id, {post_column}, DATE({time_column})
+ON DUPLICATE KEY UPDATE
+    interaction_strength = interaction_strength + VALUES(interaction_strength),
+    interaction_count = interaction_count + VALUES(interaction_count),
+    first_interaction_at = LEAST(first_interaction_at, VALUES(first_interaction_at)),
+    last_interaction_at = GREATEST(last_interaction_at, VALUES(last_interaction_at))
+"""
+
+INTERACTIONS_ROLLUP_QUERY = """
+SELECT
+    user_id,
+    post_id,
+    CAST(SUM(interaction_strength) AS UNSIGNED) AS interaction_strength,
+    CAST(SUM(interaction_count) AS UNSIGNED) AS interaction_count,
+    MAX(last_interaction_at) AS timestamp,
+    MIN(first_interaction_at) AS first_interaction
+FROM user_post_interactions
+WHERE interaction_date >= DATE('{cutoff_date}')
+  AND last_interaction_at > '{cutoff_date}'
+GROUP BY user_id, post_id
+"""
+
+USER_INTERACTIONS_ROLLUP_QUERY = """
+SELECT DISTINCT post_id
+FROM user_post_interactions
+WHERE user_id = %s
+"""
+
+POPULAR_POSTS_ROLLUP_QUERY = """
+SELECT p.post_id,
+       COALESCE(SUM(upi.interaction_strength), 0) AS score
+FROM posts p
+LEFT JOIN user_post_interactions upi ON p.post_id = upi.post_id
+WHERE p.created_at > '{cutoff_date}'
+GROUP BY p.post_id
+ORDER BY score DESC
+LIMIT {limit}
 """
\ No newline at end of file
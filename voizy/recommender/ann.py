@@ -0,0 +1,139 @@
+"""
+Approximate nearest-neighbour retrieval for the Voizy recommender system.
+
+This module provides an inverted-file (IVF) index over post representations.
+Posts are clustered with k-means; a query only visits the posts in the
+clusters whose centroids score highest against it, so retrieval cost grows
+with the number of probed lists instead of the catalog size.
+"""
+import logging
+from typing import Optional
+import numpy as np
+
+from voizy.recommender.scoring import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """
+    Inverted-file index for maximum inner product search.
+
+    Post biases are folded into the vectors as an extra dimension (and the
+    query gets a matching constant 1), so the inner product with a probed
+    post equals its LightFM score up to the user bias.
+    """
+
+    def __init__(
+            self,
+            n_lists: int = 0,
+            n_probe: int = 32,
+            n_iter: int = 10,
+            train_sample: int = 100_000,
+            random_state: int = 42
+    ):
+        """
+        Initialize the index
+
+        Args:
+            n_lists: Number of k-means clusters (0 picks about sqrt(n_items))
+            n_probe: Number of clusters visited per query; higher is slower
+                but closer to exact search
+            n_iter: Number of k-means iterations
+            train_sample: Maximum number of posts used to fit the centroids
+            random_state: Random seed
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.train_sample = train_sample
+        self.random_state = random_state
+
+        self.centroids = None
+        self.list_offsets = None
+        self.list_items = None
+
+    @staticmethod
+    def _augment(embeddings: np.ndarray, biases: np.ndarray) -> np.ndarray:
+        return np.hstack([embeddings, biases[:, np.newaxis]]).astype(np.float32)
+
+    def _assign(self, vectors: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Assign each vector to its nearest centroid (squared Euclidean distance)"""
+        half_norms = 0.5 * np.einsum('ij,ij->i', self.centroids, self.centroids)
+        assignments = np.empty(vectors.shape[0], dtype=np.int32)
+
+        for start in range(0, vectors.shape[0], chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(chunk @ self.centroids.T - half_norms, axis=1)
+
+        return assignments
+
+    def build(self, item_embeddings: np.ndarray, item_biases: np.ndarray) -> 'IVFIndex':
+        """
+        Cluster the posts and build the inverted lists
+
+        Args:
+            item_embeddings: Post representations, shape (n_posts, n_components)
+            item_biases: Post biases, one per post index
+
+        Returns:
+            The built index
+        """
+        vectors = self._augment(item_embeddings, item_biases)
+        n_items = vectors.shape[0]
+
+        n_lists = self.n_lists or int(np.sqrt(n_items))
+        n_lists = max(1, min(n_lists, n_items))
+
+        rng = np.random.default_rng(self.random_state)
+        sample = vectors
+        if n_items > self.train_sample:
+            sample = vectors[rng.choice(n_items, self.train_sample, replace=False)]
+
+        self.centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            assignments = self._assign(sample)
+            counts = np.bincount(assignments, minlength=n_lists)
+
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignments, sample)
+
+            non_empty = counts > 0
+            self.centroids[non_empty] = sums[non_empty] / counts[non_empty, np.newaxis]
+
+            # Reseed empty clusters from random sample points
+            n_empty = int((~non_empty).sum())
+            if n_empty:
+                self.centroids[~non_empty] = sample[rng.choice(sample.shape[0], n_empty, replace=False)]
+
+        assignments = self._assign(vectors)
+        self.list_items = np.argsort(assignments, kind='stable').astype(np.int64)
+        self.list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=self.list_offsets[1:])
+
+        logger.info(f"Built IVF index over {n_items} posts with {n_lists} lists")
+
+        return self
+
+    def search(self, user_embedding: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """
+        Get candidate posts for a user
+
+        Args:
+            user_embedding: User representation
+            n_probe: Number of clusters to visit (optional, defaults to the
+                index setting)
+
+        Returns:
+            Post indices in the probed clusters
+        """
+        n_probe = min(n_probe or self.n_probe, self.centroids.shape[0])
+
+        query = np.append(user_embedding, np.float32(1.0)).astype(np.float32)
+        lists = top_k_indices(self.centroids @ query, n_probe)
+
+        return np.concatenate([
+            self.list_items[self.list_offsets[i]:self.list_offsets[i + 1]]
+            for i in lists
+        ])
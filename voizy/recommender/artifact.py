@@ -0,0 +1,197 @@
+"""
+Memory-mapped model artifacts for the Voizy recommender system.
+
+A model artifact is a directory of .npy arrays described by a
+manifest.json, so serving processes can open it with np.load(mmap_mode='r')
+instead of unpickling a LightFM model. Every worker maps the same files,
+and the OS page cache holds one copy of them.
+
+Layout:
+
+    <root>/
+        CURRENT                 name of the active version
+        <model_version>/
+            manifest.json
+            user_embeddings.npy
+            ...
+
+Versions are written to a temporary directory and renamed into place, and
+CURRENT is replaced atomically, so readers never see a partial artifact.
+"""
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+
+
+class ModelArtifact(NamedTuple):
+    """
+    Arrays and manifest of one artifact version.
+    """
+    path: str
+    manifest: Dict[str, Any]
+    arrays: Dict[str, np.ndarray]
+
+
+def is_artifact(root: str) -> bool:
+    """
+    Check whether a path holds model artifacts
+
+    Args:
+        root: Artifact root directory
+
+    Returns:
+        True if the directory has an active version
+    """
+    return os.path.isfile(os.path.join(root, CURRENT_FILE))
+
+
+def current_version(root: str) -> Optional[str]:
+    """
+    Get the active artifact version
+
+    Args:
+        root: Artifact root directory
+
+    Returns:
+        Version name, or None if nothing has been published
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _set_current(root: str, version: str) -> None:
+    """Point CURRENT at a version with an atomic rename"""
+    tmp_path = os.path.join(root, f".{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def _prune(root: str, keep: int) -> None:
+    """Delete all but the newest keep versions, never the active one"""
+    active = current_version(root)
+    versions = sorted(
+        name for name in os.listdir(root)
+        if not name.startswith('.') and os.path.isfile(os.path.join(root, name, MANIFEST_FILE))
+    )
+
+    for name in versions[:-keep] if keep > 0 else []:
+        if name != active:
+            # Processes that still map the old files keep them until they unmap
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def write_artifact(
+        root: str,
+        version: str,
+        arrays: Dict[str, Optional[np.ndarray]],
+        metadata: Optional[Dict[str, Any]] = None,
+        keep: int = 3
+) -> str:
+    """
+    Write a new artifact version and make it the active one
+
+    Args:
+        root: Artifact root directory
+        version: Version name (the model version)
+        arrays: Named arrays to store; None values are skipped
+        metadata: JSON-serializable values to add to the manifest (optional)
+        keep: Number of versions to keep on disk
+
+    Returns:
+        Path of the version directory
+    """
+    os.makedirs(root, exist_ok=True)
+
+    version_dir = os.path.join(root, version)
+    tmp_dir = os.path.join(root, f".{version}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    entries = {}
+    for name, array in arrays.items():
+        if array is None:
+            continue
+
+        array = np.ascontiguousarray(array)
+        if array.dtype == object:
+            raise ValueError(f"Array {name} has object dtype and cannot be memory-mapped")
+
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array, allow_pickle=False)
+        entries[name] = {
+            'file': f"{name}.npy",
+            'dtype': array.dtype.str,
+            'shape': list(array.shape)
+        }
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_version': version,
+        'created_at': datetime.now().isoformat(),
+        **(metadata or {}),
+        'arrays': entries
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(version_dir):
+        shutil.rmtree(version_dir)
+    os.replace(tmp_dir, version_dir)
+
+    _set_current(root, version)
+    _prune(root, keep)
+
+    logger.info(f"Wrote model artifact {version_dir} ({len(entries)} arrays)")
+
+    return version_dir
+
+
+def read_artifact(root: str, version: Optional[str] = None, mmap_mode: Optional[str] = 'r') -> ModelArtifact:
+    """
+    Open an artifact version
+
+    Args:
+        root: Artifact root directory
+        version: Version name (optional, defaults to the active version)
+        mmap_mode: np.load memory-map mode; None reads the arrays into memory
+
+    Returns:
+        Model artifact with its arrays
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No model artifact in {root}")
+
+    version_dir = os.path.join(root, version)
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version', 0) > FORMAT_VERSION:
+        raise ValueError(
+            f"Artifact {version_dir} has format version {manifest['format_version']}, "
+            f"this code reads up to {FORMAT_VERSION}"
+        )
+
+    arrays = {}
+    for name, entry in manifest['arrays'].items():
+        array = np.load(os.path.join(version_dir, entry['file']), mmap_mode=mmap_mode, allow_pickle=False)
+        if array.dtype.str != entry['dtype'] or list(array.shape) != entry['shape']:
+            raise ValueError(f"Array {name} in {version_dir} does not match its manifest entry")
+        arrays[name] = array
+
+    return ModelArtifact(version_dir, manifest, arrays)
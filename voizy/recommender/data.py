@@ -6,51 +6,118 @@ recommender system, including user-item interactions, user features, and
 post features.
 """
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine
 from lightfm.data import Dataset
 from scipy.sparse import csr_matrix
 
+from voizy.db.connection import get_sqlalchemy_engine
 from voizy.db.queries import (
     INTERACTIONS_QUERY,
+    INTERACTION_EVENTS_QUERY,
+    INTERACTIONS_AGGREGATED_QUERY,
+    INTERACTIONS_ROLLUP_QUERY,
     USER_FEATURES_QUERY,
-    POST_FEATURES_QUERY,
-    USER_INTERACTIONS_QUERY,
-    POPULAR_POSTS_QUERY
+    POST_FEATURES_QUERY
 )
+# Request-time lookups live in lookups.py so serving does not import pandas
+from voizy.recommender.lookups import (  # noqa: F401
+    get_user_interactions,
+    fetch_recent_interactions,
+    get_popular_posts
+)
+from voizy.recommender.interactions import InteractionArrays, InteractionArraysBuilder
 
 logger = logging.getLogger(__name__)
 
 
+def read_sql_chunks(query: str, db_config: Dict[str, str], chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Stream a query result in chunks through a server-side cursor
+
+    Args:
+        query: SQL query
+        db_config: Database configuration
+        chunksize: Number of rows per chunk
+
+    Returns:
+        Iterator of DataFrames with at most chunksize rows each
+    """
+    engine = get_sqlalchemy_engine(db_config)
+
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for chunk in pd.read_sql(query, conn, chunksize=chunksize):
+            yield chunk
+
+
+def _read_sql(query: str, db_config: Dict[str, str], chunksize: Optional[int] = None) -> pd.DataFrame:
+    """
+    Read a query result into a DataFrame using the shared engine
+
+    Args:
+        query: SQL query
+        db_config: Database configuration
+        chunksize: Stream the result in chunks of this many rows (optional)
+
+    Returns:
+        DataFrame with the query result
+    """
+    if chunksize is None:
+        return pd.read_sql(query, get_sqlalchemy_engine(db_config))
+
+    chunks = list(read_sql_chunks(query, db_config, chunksize))
+    if not chunks:
+        return pd.read_sql(query, get_sqlalchemy_engine(db_config))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _interactions_query(events_query: str, aggregate: bool, use_rollup: bool) -> str:
+    """
+    Pick the interactions query for a fetch
+
+    The rollup already holds one row per user, post and day, so reading it
+    always returns aggregated rows. Rows are selected by day and by their
+    last interaction, so with since a day's earlier events are included;
+    incremental deltas should read the event tables instead.
+    """
+    if use_rollup:
+        return INTERACTIONS_ROLLUP_QUERY
+    return INTERACTIONS_AGGREGATED_QUERY if aggregate else events_query
+
+
 def fetch_interactions_data(
-        db_conn,
         db_config: Dict[str, str],
-        days_limit: int = 30
+        days_limit: int = 30,
+        chunksize: Optional[int] = None,
+        since: Optional[datetime] = None,
+        aggregate: bool = False,
+        use_rollup: bool = False
 ) -> pd.DataFrame:
     """
     Fetch user-post interactions from database
 
     Args:
-        db_conn: Database connection
         db_config: Database configuration
         days_limit: Limit data to recent days
+        chunksize: Stream the result in chunks of this many rows (optional)
+        since: Only fetch interactions after this time; overrides days_limit (optional)
+        aggregate: Group by user and post in the database; rows then hold the
+            summed strength, the interaction_count and the last timestamp
+        use_rollup: Read aggregated rows from the user_post_interactions rollup
+            instead of the event tables
 
     Returns:
         DataFrame with user-post interactions
     """
-    cutoff_date = datetime.now() - timedelta(days=days_limit)
+    cutoff_date = since if since is not None else datetime.now() - timedelta(days=days_limit)
     cutoff_date_str = cutoff_date.strftime('%Y-%m-%d %H:%M:%S')
 
-    connection_str = f"mysql+mysqlconnector://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
-    engine = create_engine(connection_str)
-
-    query = INTERACTIONS_QUERY.format(cutoff_date=cutoff_date_str)
+    query = _interactions_query(INTERACTIONS_QUERY, aggregate, use_rollup).format(cutoff_date=cutoff_date_str)
 
     try:
-        interactions_df = pd.read_sql(query, engine)
+        interactions_df = _read_sql(query, db_config, chunksize)
         logger.info(f"Fetched {len(interactions_df)} interaction records")
         return interactions_df
     except Exception as e:
@@ -58,22 +125,72 @@ def fetch_interactions_data(
         raise
 
 
-def fetch_user_features(db_conn, db_config: Dict[str, str]) -> pd.DataFrame:
+def fetch_interaction_arrays(
+        db_config: Dict[str, str],
+        days_limit: int = 30,
+        chunksize: int = 100_000,
+        since: Optional[datetime] = None,
+        with_timestamps: bool = False,
+        aggregate: bool = False,
+        use_rollup: bool = False
+) -> InteractionArrays:
+    """
+    Stream user-post interactions from database into compact arrays
+
+    Rows are read in chunks through a server-side cursor and each chunk is
+    reduced to int32 user/post codes and float32 strengths before the next
+    one is read, so the full result never exists as a DataFrame.
+
+    Args:
+        db_config: Database configuration
+        days_limit: Limit data to recent days
+        chunksize: Number of rows per chunk
+        since: Only fetch interactions after this time; overrides days_limit (optional)
+        with_timestamps: Whether to keep each interaction's timestamp, e.g.
+            for a time-based validation split
+        aggregate: Group by user and post in the database, so one row per pair
+            is transferred with its summed strength, event count and last
+            timestamp instead of one row per event
+        use_rollup: Read aggregated rows from the user_post_interactions rollup
+            instead of the event tables
+
+    Returns:
+        Interaction arrays
+    """
+    cutoff_date = since if since is not None else datetime.now() - timedelta(days=days_limit)
+    query = _interactions_query(INTERACTION_EVENTS_QUERY, aggregate, use_rollup).format(
+        cutoff_date=cutoff_date.strftime('%Y-%m-%d %H:%M:%S')
+    )
+
+    try:
+        builder = InteractionArraysBuilder(with_timestamps=with_timestamps)
+        for chunk in read_sql_chunks(query, db_config, chunksize):
+            builder.add_chunk(chunk)
+
+        interactions = builder.finish()
+        logger.info(
+            f"Fetched {len(interactions)} interaction records "
+            f"({len(interactions.user_ids)} users, {len(interactions.post_ids)} posts)"
+        )
+        return interactions
+    except Exception as e:
+        logger.error(f"Error fetching interaction data: {e}")
+        raise
+
+
+def fetch_user_features(db_config: Dict[str, str], chunksize: Optional[int] = None) -> pd.DataFrame:
     """
     Fetch user features for content-based filtering
 
     Args:
-        db_conn: Database connection
         db_config: Database configuration
+        chunksize: Stream the result in chunks of this many rows (optional)
 
     Returns:
         DataFrame with user features
     """
-    connection_str = f"mysql+mysqlconnector://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
-    engine = create_engine(connection_str)
-
     try:
-        user_features_df = pd.read_sql(USER_FEATURES_QUERY, engine)
+        user_features_df = _read_sql(USER_FEATURES_QUERY, db_config, chunksize)
         logger.info(f"Fetched features for {len(user_features_df)} users")
         return user_features_df
     except Exception as e:
@@ -82,17 +199,17 @@ def fetch_user_features(db_conn, db_config: Dict[str, str]) -> pd.DataFrame:
 
 
 def fetch_post_features(
-        db_conn,
         db_config: Dict[str, str],
-        days_limit: int = 60
+        days_limit: int = 60,
+        chunksize: Optional[int] = None
 ) -> pd.DataFrame:
     """
     Fetch post features for content-based filtering
 
     Args:
-        db_conn: Database connection
         db_config: Database configuration
         days_limit: Limit posts to recent days
+        chunksize: Stream the result in chunks of this many rows (optional)
 
     Returns:
         DataFrame with post features
@@ -100,13 +217,10 @@ def fetch_post_features(
     cutoff_date = datetime.now() - timedelta(days=days_limit)
     cutoff_date_str = cutoff_date.strftime('%Y-%m-%d %H:%M:%S')
 
-    connection_str = f"mysql+mysqlconnector://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
-    engine = create_engine(connection_str)
-
     query = POST_FEATURES_QUERY.format(cutoff_date=cutoff_date_str)
 
     try:
-        post_features_df = pd.read_sql(query, engine)
+        post_features_df = _read_sql(query, db_config, chunksize)
         logger.info(f"Fetched features for {len(post_features_df)} posts")
         return post_features_df
     except Exception as e:
@@ -114,66 +228,156 @@ def fetch_post_features(
         raise
 
 
-def extract_user_features(user_features_df: pd.DataFrame) -> List[str]:
+def _present(values: pd.Series) -> np.ndarray:
     """
-    Extract user features from DataFrame
+    Mask of values that are set: not null, not empty and not zero
+    """
+    mask = values.notna().to_numpy()
+    if values.dtype == object:
+        mask &= (values.astype(str).str.strip() != '').to_numpy()
+    else:
+        mask &= (values != 0).to_numpy()
+    return mask
+
+
+def _split_pairs(ids: np.ndarray, values: pd.Series, prefix: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split comma-separated values into (id, prefixed value) pairs
+    """
+    mask = _present(values)
+    exploded = pd.Series(values.to_numpy()[mask]).astype(str).str.split(',').explode()
+    return ids[mask][exploded.index.to_numpy()], (prefix + exploded.str.strip()).to_numpy(dtype=object)
+
+
+def get_age_groups(ages: np.ndarray) -> np.ndarray:
+    """
+    Convert an array of ages to age groups (vectorized get_age_group)
+
+    Args:
+        ages: User ages
+
+    Returns:
+        Array of age group strings
+    """
+    return np.select(
+        [ages < 18, ages < 25, ages < 35, ages < 45, ages < 55],
+        ["under18", "18-24", "25-34", "35-44", "45-54"],
+        default="55plus"
+    ).astype(object)
+
+
+def user_feature_pairs(user_features_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extract (user ID, feature) pairs from DataFrame in bulk
 
     Args:
         user_features_df: DataFrame with user features
 
     Returns:
-        List of feature strings
+        Tuple containing:
+            - user_ids: int64 array of user IDs
+            - features: Array of feature strings, aligned with user_ids
     """
-    features = []
+    df = user_features_df[user_features_df['user_id'].notna()]
+    ids = df['user_id'].to_numpy(dtype=np.int64)
 
-    for _, row in user_features_df.iterrows():
-        if 'city_of_residence' in row and row['city_of_residence']:
-            features.append(f"city:{row['city_of_residence']}")
+    id_parts, feature_parts = [], []
 
-        if 'age' in row and row['age']:
-            features.append(f"age_group:{get_age_group(row['age'])}")
+    if 'city_of_residence' in df:
+        mask = _present(df['city_of_residence'])
+        id_parts.append(ids[mask])
+        feature_parts.append(("city:" + df['city_of_residence'][mask].astype(str)).to_numpy(dtype=object))
 
-        if 'interests' in row and row['interests']:
-            interests = row['interests'].split(',')
-            for interest in interests:
-                features.append(f"interest:{interest.strip()}")
+    if 'age' in df:
+        ages = pd.to_numeric(df['age'], errors='coerce')
+        mask = _present(ages)
+        id_parts.append(ids[mask])
+        feature_parts.append("age_group:" + get_age_groups(ages.to_numpy()[mask]))
 
-    return list(set(features))
+    if 'interests' in df:
+        pair_ids, pair_features = _split_pairs(ids, df['interests'], "interest:")
+        id_parts.append(pair_ids)
+        feature_parts.append(pair_features)
 
+    if not id_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
 
-def extract_post_features(post_features_df: pd.DataFrame) -> List[str]:
+    return np.concatenate(id_parts), np.concatenate(feature_parts)
+
+
+def post_feature_pairs(post_features_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Extract post features from DataFrame
+    Extract (post ID, feature) pairs from DataFrame in bulk
 
     Args:
         post_features_df: DataFrame with post features
 
     Returns:
-        List of feature strings
+        Tuple containing:
+            - post_ids: int64 array of post IDs
+            - features: Array of feature strings, aligned with post_ids
     """
-    features = []
+    df = post_features_df[post_features_df['post_id'].notna()]
+    ids = df['post_id'].to_numpy(dtype=np.int64)
 
-    for _, row in post_features_df.iterrows():
-        if 'author_id' in row and row['author_id']:
-            features.append(f"author:{row['author_id']}")
+    id_parts, feature_parts = [], []
 
-        if 'is_poll' in row and row['is_poll']:
-            features.append("content_type:poll")
+    if 'author_id' in df:
+        author_ids = pd.to_numeric(df['author_id'], errors='coerce')
+        mask = _present(author_ids)
+        id_parts.append(ids[mask])
+        feature_parts.append(("author:" + author_ids[mask].astype(np.int64).astype(str)).to_numpy(dtype=object))
 
-        if 'has_location' in row and row['has_location']:
-            features.append("has_location")
+    for column, feature in (('is_poll', "content_type:poll"), ('has_location', "has_location")):
+        if column in df:
+            mask = _present(pd.to_numeric(df[column], errors='coerce'))
+            id_parts.append(ids[mask])
+            feature_parts.append(np.full(int(mask.sum()), feature, dtype=object))
 
-        if 'hashtags' in row and row['hashtags']:
-            hashtags = row['hashtags'].split(',')
-            for hashtag in hashtags:
-                features.append(f"hashtag:{hashtag.strip()}")
+    if 'hashtags' in df:
+        pair_ids, pair_features = _split_pairs(ids, df['hashtags'], "hashtag:")
+        id_parts.append(pair_ids)
+        feature_parts.append(pair_features)
 
-        if 'media_types' in row and row['media_types']:
-            media_types = row['media_types'].split(',')
-            for media_type in media_types:
-                features.append(f"media:{media_type.strip()}")
+    # The media column is named after the first SELECT of the UNION (media_type)
+    for column in ('media_type', 'media_types'):
+        if column in df:
+            pair_ids, pair_features = _split_pairs(ids, df[column], "media:")
+            id_parts.append(pair_ids)
+            feature_parts.append(pair_features)
 
-    return list(set(features))
+    if not id_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
+
+    return np.concatenate(id_parts), np.concatenate(feature_parts)
+
+
+def extract_user_features(user_features_df: pd.DataFrame) -> List[str]:
+    """
+    Extract user features from DataFrame
+
+    Args:
+        user_features_df: DataFrame with user features
+
+    Returns:
+        List of feature strings
+    """
+    _, features = user_feature_pairs(user_features_df)
+    return np.unique(features.astype(str)).tolist()
+
+
+def extract_post_features(post_features_df: pd.DataFrame) -> List[str]:
+    """
+    Extract post features from DataFrame
+
+    Args:
+        post_features_df: DataFrame with post features
+
+    Returns:
+        List of feature strings
+    """
+    _, features = post_feature_pairs(post_features_df)
+    return np.unique(features.astype(str)).tolist()
 
 
 def get_age_group(age: int) -> str:
@@ -200,6 +404,23 @@ def get_age_group(age: int) -> str:
         return "55plus"
 
 
+def _group_pairs(
+        ids: np.ndarray,
+        features: np.ndarray,
+        mapping: Dict[int, int]
+) -> List[Tuple[int, List[str]]]:
+    """
+    Group (id, feature) pairs into per-id feature lists, keeping ids in the mapping
+    """
+    known_ids = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+    mask = np.isin(ids, known_ids)
+    if not mask.any():
+        return []
+
+    grouped = pd.Series(features[mask]).groupby(ids[mask], sort=False).agg(list)
+    return list(zip(grouped.index.tolist(), grouped.tolist()))
+
+
 def build_user_features_matrix(
         user_features_df: pd.DataFrame,
         user_mapping: Dict[int, int],
@@ -218,35 +439,9 @@ def build_user_features_matrix(
     Returns:
         User features matrix
     """
-    user_features = {}
-
-    for _, row in user_features_df.iterrows():
-        if 'user_id' not in row:
-            continue
-
-        user_id = int(row['user_id'])
-        if user_id not in user_mapping:
-            continue
-
-        user_features_list = []
-
-        if 'city_of_residence' in row and row['city_of_residence']:
-            user_features_list.append(f"city:{row['city_of_residence']}")
-
-        if 'age' in row and row['age']:
-            user_features_list.append(f"age_group:{get_age_group(row['age'])}")
-
-        if 'interests' in row and row['interests']:
-            interests = row['interests'].split(',')
-            for interest in interests:
-                user_features_list.append(f"interest:{interest.strip()}")
+    ids, user_features = user_feature_pairs(user_features_df)
 
-        user_features[user_id] = user_features_list
-
-    return dataset.build_user_features(
-        ((user_id, features) for user_id, features in user_features.items() if user_id in user_mapping),
-        normalize=True
-    )
+    return dataset.build_user_features(_group_pairs(ids, user_features, user_mapping), normalize=True)
 
 
 def build_post_features_matrix(
@@ -267,88 +462,6 @@ def build_post_features_matrix(
     Returns:
         Post features matrix
     """
-    post_features = {}
-
-    for _, row in post_features_df.iterrows():
-        if 'post_id' not in row:
-            continue
-
-        post_id = int(row['post_id'])
-        if post_id not in post_mapping:
-            continue
-
-        post_features_list = []
-
-        if 'author_id' in row and row['author_id']:
-            post_features_list.append(f"author:{row['author_id']}")
-
-        if 'is_poll' in row and row['is_poll']:
-            post_features_list.append("content_type:poll")
-
-        if 'has_location' in row and row['has_location']:
-            post_features_list.append("has_location")
-
-        if 'hashtags' in row and row['hashtags']:
-            hashtags = row['hashtags'].split(',')
-            for hashtag in hashtags:
-                post_features_list.append(f"hashtag:{hashtag.strip()}")
-
-        if 'media_types' in row and row['media_types']:
-            media_types = row['media_types'].split(',')
-            for media_type in media_types:
-                post_features_list.append(f"media:{media_type.strip()}")
-
-        post_features[post_id] = post_features_list
-
-    return dataset.build_item_features(
-        ((post_id, features) for post_id, features in post_features.items() if post_id in post_mapping),
-        normalize=True
-    )
-
-
-def get_user_interactions(db_conn, user_id: int) -> List[int]:
-    """
-    Get posts that user has already interacted with
-
-    Args:
-        db_conn: Database connection
-        user_id: User ID
-
-    Returns:
-        List of post IDs
-    """
-    cursor = db_conn.cursor()
-
-    cursor.execute(USER_INTERACTIONS_QUERY, (user_id, user_id, user_id, user_id))
-    result = cursor.fetchall()
-    cursor.close()
-
-    seen_posts = [row[0] for row in result]
-    return seen_posts
-
-
-def get_popular_posts(db_conn, n: int = 10, days_limit: int = 7) -> List[int]:
-    """
-    Get most popular recent posts as fallback
-
-    Args:
-        db_conn: Database connection
-        n: Number of posts to return
-        days_limit: Limit to posts from the last N days
-
-    Returns:
-        List of post IDs
-    """
-    cursor = db_conn.cursor()
-
-    cutoff_date = datetime.now() - timedelta(days=days_limit)
-    cutoff_date_str = cutoff_date.strftime('%Y-%m-%d %H:%M:%S')
-
-    query = POPULAR_POSTS_QUERY.format(cutoff_date=cutoff_date_str, limit=n)
-
-    cursor.execute(query)
-    result = cursor.fetchall()
-    cursor.close()
+    ids, post_features = post_feature_pairs(post_features_df)
 
-    popular_posts = [row[0] for row in result]
-    return popular_posts
\ No newline at end of file
+    return dataset.build_item_features(_group_pairs(ids, post_features, post_mapping), normalize=True)
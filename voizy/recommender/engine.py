@@ -6,19 +6,98 @@ functionality for the hybrid recommendation system combining collaborative
 filtering and content-based approaches.
 """
 import logging
+import os
 import pickle
-from typing import Dict, List, Tuple, Optional, Any
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, Tuple
 import numpy as np
-from lightfm import LightFM
-from lightfm.data import Dataset
-from lightfm.evaluation import precision_at_k, auc_score
-from scipy.sparse import csr_matrix
 
-from voizy.db.connection import get_db_connection
+from voizy.db.connection import DatabasePool
+from voizy.recommender.ids import IdIndex
+from voizy.recommender.interactions import InteractionArrays
+from voizy.recommender.scoring import ScoringEngine
+from voizy.recommender.seen import SeenItemsIndex
+
+if TYPE_CHECKING:
+    # Training-only dependencies, imported where they are used so serving
+    # processes load just NumPy and the model artifact
+    from lightfm import LightFM
+    from scipy.sparse import csr_matrix
 
 logger = logging.getLogger(__name__)
 
 
+class RankedList(NamedTuple):
+    """
+    Ranked candidate posts for one user, best first.
+
+    Holds enough posts that any limit up to the ranking depth can be served
+    with or without the posts the user has already seen.
+    """
+    post_ids: np.ndarray
+    scores: np.ndarray
+    seen: np.ndarray
+    model_version: Optional[str] = None
+
+    def top(self, n: int, exclude_seen: bool = True, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Get a slice of the ranked list
+
+        Args:
+            n: Number of recommendations to return
+            exclude_seen: Whether to skip posts the user has already interacted with
+            offset: Number of leading recommendations to skip
+
+        Returns:
+            List of recommended post IDs with scores
+        """
+        post_ids, scores = self.post_ids, self.scores
+        if exclude_seen:
+            post_ids, scores = post_ids[~self.seen], scores[~self.seen]
+
+        return [
+            {'post_id': int(post_id), 'score': float(score)}
+            for post_id, score in zip(post_ids[offset:offset + n], scores[offset:offset + n])
+        ]
+
+    def count(self, exclude_seen: bool = True) -> int:
+        """
+        Get the number of posts available for slicing
+
+        Args:
+            exclude_seen: Whether to skip posts the user has already interacted with
+
+        Returns:
+            Number of posts
+        """
+        if exclude_seen:
+            return int((~self.seen).sum())
+        return len(self.post_ids)
+
+
+class ModelSnapshot(NamedTuple):
+    """
+    Everything serving needs from one trained model.
+
+    A snapshot is not modified once published (only the seen-items overlay,
+    which has its own lock, keeps growing). The recommender replaces it with
+    a single reference assignment, so a request that started on the old
+    snapshot finishes on it.
+    """
+    model_version: Optional[str]
+    user_mapping: IdIndex
+    post_mapping: IdIndex
+    scoring_engine: Optional[ScoringEngine] = None
+    seen_items: Optional[SeenItemsIndex] = None
+    user_features_vocabulary: Optional[np.ndarray] = None
+    post_features_vocabulary: Optional[np.ndarray] = None
+
+    @classmethod
+    def empty(cls) -> 'ModelSnapshot':
+        """Snapshot of a recommender with no model"""
+        return cls(None, IdIndex(np.empty(0, dtype=np.int64)), IdIndex(np.empty(0, dtype=np.int64)))
+
+
 class VoizyRecommender:
     """
     Main recommender engine for Voizy.
@@ -27,30 +106,72 @@ class VoizyRecommender:
     combining collaborative filtering with content-based approaches.
     """
 
-    def __init__(self, db_config: Dict[str, Any], model_path: Optional[str] = None):
+    def __init__(
+            self,
+            db_config: Dict[str, Any],
+            model_path: Optional[str] = None,
+            ann_params: Optional[Dict[str, Any]] = None,
+            ranked_list_depth: int = 500,
+            connect: bool = True,
+            use_rollup: bool = False
+    ):
         """
         Initialize the recommender system
 
         Args:
             db_config: Database connection configuration
             model_path: Path to saved model (optional)
+            ann_params: IVFIndex parameters; enables approximate retrieval when set (optional)
+            ranked_list_depth: Number of unseen posts kept in each ranked list
+            connect: Whether to open the database pool; training processes
+                that only read through SQLAlchemy do not need it
+            use_rollup: Read popular and seen posts from the
+                user_post_interactions rollup instead of the event tables
         """
         self.db_config = db_config
-        self.conn = None
+        self.ann_params = ann_params
+        self.ranked_list_depth = ranked_list_depth
+        self.use_rollup = use_rollup
+        self.db_pool = None
         self.model = None
-        self.user_mapping = {}
-        self.post_mapping = {}
-        self.dataset = Dataset()
+        self.snapshot = ModelSnapshot.empty()
+
+        # When the model was last trained from scratch; incremental updates keep it
+        self.full_trained_at: Optional[datetime] = None
 
-        self._connect_to_db()
+        # Mappings and seen items from prepare_data, published with the trained model
+        self._staged = None
+
+        if connect:
+            self._connect_to_db()
 
         if model_path:
             self.load_model(model_path)
 
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.snapshot.model_version
+
+    @property
+    def user_mapping(self) -> IdIndex:
+        return self.snapshot.user_mapping
+
+    @property
+    def post_mapping(self) -> IdIndex:
+        return self.snapshot.post_mapping
+
+    @property
+    def scoring_engine(self) -> Optional[ScoringEngine]:
+        return self.snapshot.scoring_engine
+
+    @property
+    def seen_items(self) -> Optional[SeenItemsIndex]:
+        return self.snapshot.seen_items
+
     def _connect_to_db(self) -> None:
-        """Establish connection to the database"""
+        """Create the database connection pool"""
         try:
-            self.conn = get_db_connection(self.db_config)
+            self.db_pool = DatabasePool(self.db_config, pool_size=self.db_config.get('pool_size', 8))
             logger.info("Successfully connected to database")
         except Exception as e:
             logger.error(f"Error connecting to database: {e}")
@@ -58,15 +179,18 @@ class VoizyRecommender:
 
     def prepare_data(
             self,
-            interactions_df,
+            interactions,
             user_features_df=None,
             post_features_df=None
-    ) -> Tuple[csr_matrix, Optional[csr_matrix], Optional[csr_matrix]]:
+    ) -> Tuple['csr_matrix', Optional['csr_matrix'], Optional['csr_matrix']]:
         """
         Prepare data for the LightFM model
 
+        The new mappings and seen items are staged and only replace the
+        serving snapshot once train_model has produced a model for them.
+
         Args:
-            interactions_df: User-post interactions
+            interactions: User-post interactions, as InteractionArrays or a DataFrame
             user_features_df: User features (optional)
             post_features_df: Post features (optional)
 
@@ -76,76 +200,142 @@ class VoizyRecommender:
                 - user_features_matrix: User features matrix (optional)
                 - item_features_matrix: Item features matrix (optional)
         """
-        interactions_df = interactions_df.dropna(subset=['user_id', 'post_id'])
+        if not isinstance(interactions, InteractionArrays):
+            interactions = InteractionArrays.from_frame(interactions, with_timestamps=False)
 
-        interactions_df['user_id'] = interactions_df['user_id'].astype(int)
-        interactions_df['post_id'] = interactions_df['post_id'].astype(int)
+        user_mapping = IdIndex(interactions.user_ids)
+        post_mapping = IdIndex(interactions.post_ids)
 
-        unique_user_ids = interactions_df['user_id'].unique()
-        unique_post_ids = interactions_df['post_id'].unique()
+        interactions_matrix = interactions.to_matrix()
 
-        user_features = None
+        seen_items = SeenItemsIndex.from_interactions(
+            interactions_matrix,
+            watermark=interactions.watermark or datetime.now()
+        )
+
+        user_features_matrix = None
+        user_features_vocabulary = None
         if user_features_df is not None:
-            from voizy.recommender.data import extract_user_features
-            user_features = extract_user_features(user_features_df)
+            from voizy.recommender.features import build_user_features
+            user_feature_set = build_user_features(user_features_df, user_mapping.ids)
+            user_features_matrix = user_feature_set.matrix
+            user_features_vocabulary = user_feature_set.vocabulary
 
-        item_features = None
+        post_features_matrix = None
+        post_features_vocabulary = None
         if post_features_df is not None:
-            from voizy.recommender.data import extract_post_features
-            item_features = extract_post_features(post_features_df)
-
-        self.dataset.fit(
-            users=unique_user_ids,
-            items=unique_post_ids,
-            user_features=user_features,
-            item_features=item_features
+            from voizy.recommender.features import build_post_features
+            post_feature_set = build_post_features(post_features_df, post_mapping.ids)
+            post_features_matrix = post_feature_set.matrix
+            post_features_vocabulary = post_feature_set.vocabulary
+
+        self._staged = ModelSnapshot(
+            None,
+            user_mapping,
+            post_mapping,
+            seen_items=seen_items,
+            user_features_vocabulary=user_features_vocabulary,
+            post_features_vocabulary=post_features_vocabulary
         )
 
-        self.user_mapping = {int(user): i for i, user in enumerate(unique_user_ids)}
-        self.post_mapping = {int(post): i for i, post in enumerate(unique_post_ids)}
+        return interactions_matrix, user_features_matrix, post_features_matrix
 
-        from scipy.sparse import coo_matrix
-        interactions = coo_matrix(
-            (
-                interactions_df['interaction_strength'].astype(float),
-                (
-                    interactions_df['user_id'].map(self.user_mapping),
-                    interactions_df['post_id'].map(self.post_mapping)
-                )
-            ),
-            shape=(len(unique_user_ids), len(unique_post_ids))
-        )
+    def split_validation(
+            self,
+            interactions,
+            validation_fraction: float = 0.1,
+            interactions_matrix: Optional['csr_matrix'] = None
+    ) -> Tuple['csr_matrix', Optional['csr_matrix']]:
+        """
+        Hold out the most recent interactions as a validation split
 
-        interactions_matrix = interactions.tocsr()
+        Validation pairs the user also interacted with before the cutoff are
+        dropped, so the split only asks the model to rank posts the user had
+        not engaged with yet. Aggregated rows hold a pair's whole history, so
+        they are split by their first interaction: pairs first engaged after
+        the cutoff are held out and all others stay in training.
 
-        user_features_matrix = None
-        if user_features_df is not None and user_features:
-            from voizy.recommender.data import build_user_features_matrix
-            user_features_matrix = build_user_features_matrix(
-                user_features_df, self.user_mapping, self.dataset, user_features
-            )
+        Pass the matrix prepare_data returned as interactions_matrix: the
+        train split is then derived from it by subtracting the held-out
+        interactions, so only the small validation part is built again.
 
-        post_features_matrix = None
-        if post_features_df is not None and item_features:
-            from voizy.recommender.data import build_post_features_matrix
-            post_features_matrix = build_post_features_matrix(
-                post_features_df, self.post_mapping, self.dataset, item_features
-            )
+        Args:
+            interactions: User-post interactions passed to prepare_data, as
+                InteractionArrays with timestamps or a DataFrame
+            validation_fraction: Share of the interactions, by time, to hold out
+            interactions_matrix: Matrix of all the interactions from prepare_data (optional)
 
-        return interactions_matrix, user_features_matrix, post_features_matrix
+        Returns:
+            Tuple containing:
+                - train_matrix: Interactions up to the cutoff
+                - validation_matrix: Later interactions, or None if nothing was held out
+        """
+        if not isinstance(interactions, InteractionArrays):
+            interactions = InteractionArrays.from_frame(interactions)
+
+        if interactions_matrix is None:
+            interactions_matrix = interactions.to_matrix()
+
+        if validation_fraction <= 0 or interactions.timestamps is None or len(interactions) == 0:
+            return interactions_matrix, None
+
+        if interactions.first_timestamps is not None:
+            timestamps = interactions.first_timestamps.astype(np.int64)
+        else:
+            timestamps = interactions.timestamps.astype(np.int64)
+        cutoff = np.quantile(timestamps, 1 - validation_fraction, method='lower')
+        held_out = timestamps > cutoff
+
+        held_out_matrix = interactions.to_matrix(held_out)
+        if held_out_matrix.nnz == 0:
+            logger.info("No interactions held out for validation")
+            return interactions_matrix, None
+
+        # Strengths are sums of small integers, so pairs with only held-out interactions cancel exactly
+        train_matrix = (interactions_matrix - held_out_matrix).tocsr()
+        train_matrix.eliminate_zeros()
+
+        validation_matrix = held_out_matrix - held_out_matrix.multiply(train_matrix.astype(bool))
+        validation_matrix.eliminate_zeros()
+        del held_out_matrix
+
+        if validation_matrix.nnz == 0:
+            logger.info("No interactions held out for validation")
+            return interactions_matrix, None
+
+        logger.info(
+            f"Validation split at {np.datetime64(int(cutoff), 's')}: "
+            f"{train_matrix.nnz} train, {validation_matrix.nnz} validation interactions"
+        )
+
+        return train_matrix, validation_matrix.tocsr()
 
     def train_model(
             self,
-            interactions_matrix: csr_matrix,
-            user_features_matrix: Optional[csr_matrix] = None,
-            post_features_matrix: Optional[csr_matrix] = None,
+            interactions_matrix: 'csr_matrix',
+            user_features_matrix: Optional['csr_matrix'] = None,
+            post_features_matrix: Optional['csr_matrix'] = None,
             num_components: int = 30,
             learning_rate: float = 0.05,
-            epochs: int = 20
-    ) -> LightFM:
+            epochs: int = 20,
+            num_threads: int = 1,
+            loss: str = 'warp',
+            max_sampled: int = 10,
+            validation_matrix: Optional['csr_matrix'] = None,
+            validation_users: int = 2000,
+            patience: int = 2,
+            min_delta: float = 0.0,
+            on_stage: Optional[Callable[[str], None]] = None
+    ) -> 'LightFM':
         """
         Train the LightFM model
 
+        With a validation matrix, training stops early: after each epoch
+        precision@5 is measured on a sample of the validation users, and once
+        it has not improved for patience epochs the best epoch's weights are
+        restored. The held-out interactions are then trained on for one epoch
+        so the model still learns from the most recent activity.
+
         Args:
             interactions_matrix: User-item interactions
             user_features_matrix: User features (optional)
@@ -153,68 +343,421 @@ class VoizyRecommender:
             num_components: Number of latent factors
             learning_rate: Learning rate
             epochs: Number of epochs
+            num_threads: Number of threads for training and evaluation
+            loss: LightFM loss function, e.g. 'warp' for implicit feedback or 'bpr'
+            max_sampled: Maximum negative samples per positive for the WARP losses
+            validation_matrix: Held-out interactions from split_validation (optional)
+            validation_users: Number of validation users sampled for the per-epoch metric
+            patience: Epochs without improvement before training stops
+            min_delta: Minimum increase of the metric that counts as improvement
+            on_stage: Called with the name of each training stage as it starts (optional)
 
         Returns:
             trained model
         """
+        import time
+        from lightfm import LightFM
+        from lightfm.evaluation import precision_at_k
+        from voizy.recommender.incremental import model_state_arrays, set_model_state
+
         self.model = LightFM(
             no_components=num_components,
             learning_rate=learning_rate,
-            loss='warp',  # Weighted Approximate-Rank Pairwise loss for implicit feedback
+            loss=loss,
+            max_sampled=max_sampled,
             random_state=42
         )
+        self.full_trained_at = datetime.now()
 
-        logger.info(f"Training model with {epochs} epochs...")
-        self.model.fit(
-            interactions=interactions_matrix,
-            user_features=user_features_matrix,
-            item_features=post_features_matrix,
-            epochs=epochs,
-            verbose=True
+        sampled_validation = None
+        if validation_matrix is not None:
+            sampled_validation = self._sample_validation_users(validation_matrix, validation_users)
+
+        logger.info(f"Training model with up to {epochs} epochs on {num_threads} threads...")
+
+        best_precision, best_epoch, best_state = -1.0, 0, None
+        epochs_run = 0
+
+        # One epoch per call so progress can be reported and training can stop early
+        for epoch in range(epochs):
+            if on_stage is not None:
+                on_stage(f"fit epoch {epoch + 1}/{epochs}")
+
+            start = time.perf_counter()
+            self.model.fit_partial(
+                interactions=interactions_matrix,
+                user_features=user_features_matrix,
+                item_features=post_features_matrix,
+                epochs=1,
+                num_threads=num_threads
+            )
+            fit_seconds = time.perf_counter() - start
+            epochs_run = epoch + 1
+
+            if sampled_validation is None:
+                logger.info(f"Finished epoch {epoch + 1}/{epochs} in {fit_seconds:.1f}s")
+                continue
+
+            if on_stage is not None:
+                on_stage(f"evaluate epoch {epoch + 1}/{epochs}")
+
+            start = time.perf_counter()
+            precision = float(precision_at_k(
+                self.model,
+                sampled_validation,
+                train_interactions=interactions_matrix,
+                user_features=user_features_matrix,
+                item_features=post_features_matrix,
+                k=5,
+                num_threads=num_threads
+            ).mean())
+            evaluate_seconds = time.perf_counter() - start
+
+            logger.info(
+                f"Finished epoch {epoch + 1}/{epochs} in {fit_seconds:.1f}s, "
+                f"validation precision@5: {precision:.4f} ({evaluate_seconds:.1f}s)"
+            )
+
+            if precision > best_precision + min_delta:
+                best_precision, best_epoch = precision, epoch + 1
+                best_state = {name: array.copy() for name, array in model_state_arrays(self.model).items()}
+            elif epoch + 1 - best_epoch >= patience:
+                logger.info(f"Validation precision@5 has not improved for {patience} epochs, stopping")
+                break
+
+        if validation_matrix is not None:
+            if best_state is not None and best_epoch < epochs_run:
+                set_model_state(self.model, best_state)
+
+            if on_stage is not None:
+                on_stage("fit validation interactions")
+
+            self.model.fit_partial(
+                interactions=validation_matrix,
+                user_features=user_features_matrix,
+                item_features=post_features_matrix,
+                epochs=1,
+                num_threads=num_threads
+            )
+
+            logger.info(
+                f"Model training complete. Best epoch {best_epoch}, validation precision@5: {best_precision:.4f}"
+            )
+        else:
+            logger.info("Model training complete")
+
+        self._build_scoring_engine(
+            user_features_matrix,
+            post_features_matrix,
+            model_version=datetime.now().strftime('%Y%m%d%H%M%S')
         )
 
-        train_precision = precision_at_k(
+        return self.model
+
+    @staticmethod
+    def _sample_validation_users(validation_matrix: 'csr_matrix', n_users: int) -> 'csr_matrix':
+        """Keep the validation rows of at most n_users randomly chosen users"""
+        validation_matrix = validation_matrix.tocsr()
+        users = np.flatnonzero(np.diff(validation_matrix.indptr))
+        if len(users) <= n_users:
+            return validation_matrix
+
+        sampled = np.zeros(validation_matrix.shape[0], dtype=np.float32)
+        sampled[np.random.default_rng(42).choice(users, n_users, replace=False)] = 1.0
+
+        from scipy.sparse import diags
+        sampled_matrix = (diags(sampled) @ validation_matrix).tocsr()
+        sampled_matrix.eliminate_zeros()
+        return sampled_matrix
+
+    def prepare_incremental_data(
+            self,
+            interactions_df,
+            user_features_df=None,
+            post_features_df=None
+    ) -> Tuple['csr_matrix', Optional['csr_matrix'], Optional['csr_matrix']]:
+        """
+        Prepare new interactions for warm-start training of the current model
+
+        New users and posts are appended after the existing ones, so known
+        IDs keep their indices, and the model's embeddings are grown to the
+        new user, post and feature counts. The extended mappings and seen
+        items are staged like prepare_data's.
+
+        Args:
+            interactions_df: User-post interactions since the model's watermark
+            user_features_df: User features (optional)
+            post_features_df: Post features (optional)
+
+        Returns:
+            Tuple containing:
+                - interactions_matrix: New interactions in the grown index space
+                - user_features_matrix: User features matrix (optional)
+                - item_features_matrix: Item features matrix (optional)
+        """
+        from voizy.recommender.incremental import feature_column_map, grow_model
+
+        snapshot = self.snapshot
+        if self.model is None or snapshot.scoring_engine is None:
+            raise ValueError("Incremental training needs a loaded model with its training state")
+
+        interactions_df = interactions_df.dropna(subset=['user_id', 'post_id'])
+        user_ids = interactions_df['user_id'].to_numpy(dtype=np.int64)
+        post_ids = interactions_df['post_id'].to_numpy(dtype=np.int64)
+
+        old_user_ids = snapshot.user_mapping.ids
+        old_post_ids = snapshot.post_mapping.ids
+        user_mapping = IdIndex(np.concatenate([old_user_ids, np.setdiff1d(user_ids, old_user_ids)]))
+        post_mapping = IdIndex(np.concatenate([old_post_ids, np.setdiff1d(post_ids, old_post_ids)]))
+
+        logger.info(
+            f"Incremental data: {len(interactions_df)} interactions, "
+            f"{len(user_mapping) - len(old_user_ids)} new users, "
+            f"{len(post_mapping) - len(old_post_ids)} new posts"
+        )
+
+        user_codes = user_mapping.lookup(user_ids).astype(np.int32)
+        post_codes = post_mapping.lookup(post_ids).astype(np.int32)
+
+        from scipy.sparse import coo_matrix
+        interactions_matrix = coo_matrix(
+            (interactions_df['interaction_strength'].to_numpy(dtype=np.float32), (user_codes, post_codes)),
+            shape=(len(user_mapping), len(post_mapping))
+        ).tocsr()
+
+        seen_items = None
+        if snapshot.seen_items is not None:
+            seen_indptr, seen_indices = snapshot.seen_items.compact()
+            seen_indptr = np.concatenate([
+                seen_indptr,
+                np.full(len(user_mapping) - len(old_user_ids), seen_indptr[-1], dtype=seen_indptr.dtype)
+            ])
+            seen_items = SeenItemsIndex(seen_indptr, seen_indices, watermark=snapshot.seen_items.watermark)
+
+            watermark = seen_items.watermark
+            if 'timestamp' in interactions_df and len(interactions_df) > 0:
+                watermark = interactions_df['timestamp'].max().to_pydatetime()
+            seen_items.add_many(zip(user_codes.tolist(), post_codes.tolist()), watermark=watermark)
+
+        user_features_matrix = None
+        user_features_vocabulary = None
+        if user_features_df is not None:
+            from voizy.recommender.features import build_user_features
+            user_feature_set = build_user_features(user_features_df, user_mapping.ids)
+            user_features_matrix = user_feature_set.matrix
+            user_features_vocabulary = user_feature_set.vocabulary
+
+        post_features_matrix = None
+        post_features_vocabulary = None
+        if post_features_df is not None:
+            from voizy.recommender.features import build_post_features
+            post_feature_set = build_post_features(post_features_df, post_mapping.ids)
+            post_features_matrix = post_feature_set.matrix
+            post_features_vocabulary = post_feature_set.vocabulary
+
+        grow_model(
             self.model,
-            interactions_matrix,
-            user_features=user_features_matrix,
-            item_features=post_features_matrix,
-            k=5
-        ).mean()
+            feature_column_map(
+                len(old_user_ids), snapshot.user_features_vocabulary,
+                len(user_mapping), user_features_vocabulary
+            ),
+            feature_column_map(
+                len(old_post_ids), snapshot.post_features_vocabulary,
+                len(post_mapping), post_features_vocabulary
+            )
+        )
+
+        self._staged = ModelSnapshot(
+            snapshot.model_version,
+            user_mapping,
+            post_mapping,
+            seen_items=seen_items,
+            user_features_vocabulary=user_features_vocabulary,
+            post_features_vocabulary=post_features_vocabulary
+        )
+
+        return interactions_matrix, user_features_matrix, post_features_matrix
+
+    def train_incremental(
+            self,
+            interactions_matrix: 'csr_matrix',
+            user_features_matrix: Optional['csr_matrix'] = None,
+            post_features_matrix: Optional['csr_matrix'] = None,
+            epochs: int = 3,
+            num_threads: int = 1,
+            on_stage: Optional[Callable[[str], None]] = None
+    ) -> 'LightFM':
+        """
+        Continue training the current model on new interactions
+
+        Args:
+            interactions_matrix: New interactions from prepare_incremental_data
+            user_features_matrix: User features (optional)
+            post_features_matrix: Post features (optional)
+            epochs: Number of epochs over the new interactions
+            num_threads: Number of training threads
+            on_stage: Called with the name of each training stage as it starts (optional)
+
+        Returns:
+            updated model
+        """
+        logger.info(f"Updating model with {epochs} epochs over {interactions_matrix.nnz} new interactions...")
+
+        for epoch in range(epochs):
+            if on_stage is not None:
+                on_stage(f"fit epoch {epoch + 1}/{epochs}")
 
-        train_auc = auc_score(
+            self.model.fit_partial(
+                interactions=interactions_matrix,
+                user_features=user_features_matrix,
+                item_features=post_features_matrix,
+                epochs=1,
+                num_threads=num_threads
+            )
+            logger.info(f"Finished epoch {epoch + 1}/{epochs}")
+
+        self._build_scoring_engine(
+            user_features_matrix,
+            post_features_matrix,
+            model_version=datetime.now().strftime('%Y%m%d%H%M%S')
+        )
+
+        return self.model
+
+    def _build_scoring_engine(
+            self,
+            user_features_matrix: Optional['csr_matrix'] = None,
+            post_features_matrix: Optional['csr_matrix'] = None,
+            model_version: Optional[str] = None
+    ) -> None:
+        """
+        Build the vectorized scoring engine from the current model and publish it
+
+        Uses the mappings staged by prepare_data (or the current snapshot's)
+        and swaps the finished snapshot in with one assignment.
+
+        Args:
+            user_features_matrix: User features the model was trained with (optional)
+            post_features_matrix: Post features the model was trained with (optional)
+            model_version: Version of the new model (optional, keeps the staged one)
+        """
+        base = self._staged or self.snapshot
+
+        scoring_engine = ScoringEngine.from_model(
             self.model,
-            interactions_matrix,
+            base.post_mapping.ids,
+            len(base.user_mapping),
             user_features=user_features_matrix,
             item_features=post_features_matrix
-        ).mean()
+        )
 
-        logger.info(f"Model training complete. Train precision@5: {train_precision:.4f}, Train AUC: {train_auc:.4f}")
+        if self.ann_params is not None:
+            scoring_engine.build_ann_index(**self.ann_params)
 
-        return self.model
+        self.snapshot = base._replace(
+            model_version=model_version or base.model_version,
+            scoring_engine=scoring_engine
+        )
+        self._staged = None
 
-    def save_model(self, path: str) -> bool:
+    def save_model(self, path: str, model_format: str = 'artifact') -> bool:
         """
         Save model and mappings to disk
 
         Args:
-            path: Path to save the model
+            path: Path to save the model; an artifact root directory, or a
+                file prefix for the pickle format
+            model_format: 'artifact' for memory-mappable .npy files, or
+                'pickle' to export the LightFM model and mappings
 
         Returns:
             Success status
         """
+        if model_format == 'pickle':
+            return self._save_pickle(path)
+
+        snapshot = self.snapshot
+        if snapshot.scoring_engine is None:
+            logger.error("No model to save")
+            return False
+
+        try:
+            from voizy.recommender.artifact import write_artifact
+
+            engine = snapshot.scoring_engine
+            arrays = {
+                'user_biases': engine.user_biases,
+                'user_embeddings': engine.user_embeddings,
+                'item_biases': engine.item_biases,
+                'item_embeddings': engine.item_embeddings,
+                'user_ids': snapshot.user_mapping.ids,
+                'post_ids': snapshot.post_mapping.ids,
+                'user_features_vocabulary': snapshot.user_features_vocabulary,
+                'post_features_vocabulary': snapshot.post_features_vocabulary
+            }
+            metadata = {
+                'n_users': engine.n_users,
+                'n_posts': engine.n_items,
+                'n_components': int(engine.user_embeddings.shape[1])
+            }
+
+            if snapshot.seen_items is not None:
+                arrays['seen_indptr'], arrays['seen_indices'] = snapshot.seen_items.compact()
+                watermark = snapshot.seen_items.watermark
+                metadata['seen_watermark'] = watermark.isoformat() if watermark is not None else None
+
+            if self.model is not None:
+                # Training state for warm-start updates; serving ignores it
+                from voizy.recommender.incremental import model_params, model_state_arrays
+                arrays.update(model_state_arrays(self.model))
+                metadata['training'] = {
+                    'params': model_params(self.model),
+                    'full_trained_at': self.full_trained_at.isoformat() if self.full_trained_at else None
+                }
+
+            write_artifact(path, snapshot.model_version, arrays, metadata)
+
+            logger.info(f"Model artifact {snapshot.model_version} saved to {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving model: {e}")
+            return False
+
+    def _save_pickle(self, path: str) -> bool:
+        """Export the LightFM model and mappings as pickles under a file prefix"""
         if self.model is None:
             logger.error("No model to save")
             return False
 
+        snapshot = self.snapshot
         try:
             with open(f"{path}_model.pkl", 'wb') as f:
                 pickle.dump(self.model, f)
 
+            snapshot.user_mapping.save(f"{path}_user_ids.npy")
+            snapshot.post_mapping.save(f"{path}_post_ids.npy")
+
             with open(f"{path}_mappings.pkl", 'wb') as f:
-                pickle.dump({
-                    'user_mapping': self.user_mapping,
-                    'post_mapping': self.post_mapping
-                }, f)
+                mappings = {
+                    'model_version': snapshot.model_version,
+                    'user_features_vocabulary': snapshot.user_features_vocabulary,
+                    'post_features_vocabulary': snapshot.post_features_vocabulary
+                }
+                if snapshot.scoring_engine is not None:
+                    # Feature-based representations; the model cannot rebuild them without the features
+                    engine = snapshot.scoring_engine
+                    mappings['representations'] = {
+                        'user_biases': np.asarray(engine.user_biases),
+                        'user_embeddings': np.asarray(engine.user_embeddings),
+                        'item_biases': np.asarray(engine.item_biases),
+                        'item_embeddings': np.asarray(engine.item_embeddings)
+                    }
+                if snapshot.seen_items is not None:
+                    seen_indptr, seen_indices = snapshot.seen_items.compact()
+                    mappings['seen_indptr'] = seen_indptr
+                    mappings['seen_indices'] = seen_indices
+                    mappings['seen_watermark'] = snapshot.seen_items.watermark
+                pickle.dump(mappings, f)
 
             logger.info(f"Model and mappings saved to {path}")
             return True
@@ -222,28 +765,151 @@ class VoizyRecommender:
             logger.error(f"Error saving model: {e}")
             return False
 
-    def load_model(self, path: str) -> bool:
+    def load_model(self, path: str, restore_training_state: bool = False) -> bool:
         """
         Load model and mappings from disk
 
+        Artifact directories are memory-mapped and do not restore the LightFM
+        model object, only what serving needs, unless restore_training_state
+        is set. Pickle prefixes are imported with the full model. Either way
+        the new model replaces the serving snapshot in one assignment once it
+        is fully loaded.
+
         Args:
-            path: Path to load the model from
+            path: Artifact root directory, or file prefix of a pickled model
+            restore_training_state: Whether to rebuild the LightFM model from
+                an artifact's training state for incremental training
 
         Returns:
             Success status
         """
+        from voizy.recommender.artifact import is_artifact
+
+        if is_artifact(path):
+            return self._load_artifact(path, restore_training_state)
+
+        return self._load_pickle(path)
+
+    def _load_artifact(self, path: str, restore_training_state: bool = False) -> bool:
+        """Memory-map the active artifact version"""
+        try:
+            from voizy.recommender.artifact import read_artifact
+
+            artifact = read_artifact(path)
+            arrays, manifest = artifact.arrays, artifact.manifest
+
+            seen_items = None
+            if 'seen_indptr' in arrays:
+                watermark = manifest.get('seen_watermark')
+                seen_items = SeenItemsIndex(
+                    arrays['seen_indptr'],
+                    arrays['seen_indices'],
+                    watermark=datetime.fromisoformat(watermark) if watermark else None
+                )
+
+            scoring_engine = ScoringEngine(
+                arrays['user_biases'],
+                arrays['user_embeddings'],
+                arrays['item_biases'],
+                arrays['item_embeddings'],
+                arrays['post_ids']
+            )
+            if self.ann_params is not None:
+                scoring_engine.build_ann_index(**self.ann_params)
+
+            model = None
+            full_trained_at = None
+            training = manifest.get('training')
+            if restore_training_state and training:
+                from voizy.recommender.incremental import has_model_state, restore_model
+                if has_model_state(arrays):
+                    model = restore_model(training['params'], arrays)
+                    if training.get('full_trained_at'):
+                        full_trained_at = datetime.fromisoformat(training['full_trained_at'])
+
+            self.model = model
+            self.full_trained_at = full_trained_at
+            self.snapshot = ModelSnapshot(
+                manifest['model_version'],
+                IdIndex(arrays['user_ids']),
+                IdIndex(arrays['post_ids']),
+                scoring_engine=scoring_engine,
+                seen_items=seen_items,
+                user_features_vocabulary=arrays.get('user_features_vocabulary'),
+                post_features_vocabulary=arrays.get('post_features_vocabulary')
+            )
+
+            logger.info(f"Model artifact {self.model_version} loaded from {artifact.path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading model: {e}")
+            return False
+
+    def _load_pickle(self, path: str) -> bool:
+        """Import a pickled LightFM model and mappings from a file prefix"""
         try:
             with open(f"{path}_model.pkl", 'rb') as f:
-                self.model = pickle.load(f)
+                model = pickle.load(f)
 
             with open(f"{path}_mappings.pkl", 'rb') as f:
                 mappings = pickle.load(f)
-                self.user_mapping = mappings['user_mapping']
-                self.post_mapping = mappings['post_mapping']
+
+            if 'user_mapping' in mappings:
+                # Models saved before the ID arrays were written to .npy files
+                user_mapping = IdIndex.from_mapping(mappings['user_mapping'])
+                post_mapping = IdIndex.from_mapping(mappings['post_mapping'])
+            else:
+                user_mapping = IdIndex.load(f"{path}_user_ids.npy")
+                post_mapping = IdIndex.load(f"{path}_post_ids.npy")
+
+            model_version = mappings.get('model_version') or datetime.fromtimestamp(
+                os.path.getmtime(f"{path}_model.pkl")
+            ).strftime('%Y%m%d%H%M%S')
+
+            seen_items = None
+            if 'seen_indptr' in mappings:
+                seen_items = SeenItemsIndex(
+                    mappings['seen_indptr'],
+                    mappings['seen_indices'],
+                    watermark=mappings.get('seen_watermark')
+                )
+
+            self.model = model
+            self._staged = ModelSnapshot(
+                model_version,
+                user_mapping,
+                post_mapping,
+                seen_items=seen_items,
+                user_features_vocabulary=mappings.get('user_features_vocabulary'),
+                post_features_vocabulary=mappings.get('post_features_vocabulary')
+            )
+
+            representations = mappings.get('representations')
+            if representations is not None:
+                scoring_engine = ScoringEngine(
+                    representations['user_biases'],
+                    representations['user_embeddings'],
+                    representations['item_biases'],
+                    representations['item_embeddings'],
+                    post_mapping.ids
+                )
+                if self.ann_params is not None:
+                    scoring_engine.build_ann_index(**self.ann_params)
+                self.snapshot = self._staged._replace(scoring_engine=scoring_engine)
+                self._staged = None
+            else:
+                if (model.user_embeddings.shape[0] > len(user_mapping) or
+                        model.item_embeddings.shape[0] > len(post_mapping)):
+                    logger.warning(
+                        f"Model in {path} was trained with features that the pickle does not include; "
+                        "scoring with identity features only, rankings will differ from training"
+                    )
+                self._build_scoring_engine()
 
             logger.info(f"Model loaded from {path}")
             return True
         except Exception as e:
+            self._staged = None
             logger.error(f"Error loading model: {e}")
             return False
 
@@ -264,74 +930,237 @@ class VoizyRecommender:
         Returns:
             List of recommended post IDs with scores
         """
-        if self.model is None:
+        return self.get_ranked_candidates(user_id, depth=n).top(n, exclude_seen=exclude_seen)
+
+    def _popular_ranked_list(self, n: int, model_version: Optional[str] = None) -> RankedList:
+        """
+        Build a ranked list of popular posts for users the model does not know
+
+        Args:
+            n: Number of posts
+            model_version: Version of the snapshot serving the request (optional)
+
+        Returns:
+            Ranked list with zero scores and no seen flags
+        """
+        from voizy.recommender.lookups import get_popular_posts
+        with self.db_pool.connection() as conn:
+            popular_posts = get_popular_posts(conn, n, use_rollup=self.use_rollup)
+
+        return RankedList(
+            np.asarray(popular_posts, dtype=np.int64),
+            np.zeros(len(popular_posts), dtype=np.float32),
+            np.zeros(len(popular_posts), dtype=bool),
+            model_version
+        )
+
+    def get_ranked_candidates(self, user_id: int, depth: Optional[int] = None) -> RankedList:
+        """
+        Get a user's ranked candidate posts, with seen flags
+
+        The list is deep enough to hold depth posts the user has not seen, so
+        any limit up to depth can be sliced from it with or without seen posts.
+
+        Args:
+            user_id: User ID
+            depth: Number of unseen posts to rank (optional, defaults to ranked_list_depth)
+
+        Returns:
+            Ranked list for the user
+        """
+        depth = depth or self.ranked_list_depth
+        snapshot = self.snapshot
+
+        if snapshot.scoring_engine is None:
             logger.error("Model not trained or loaded")
-            return []
+            return RankedList(np.empty(0, np.int64), np.empty(0, np.float32), np.empty(0, bool), None)
 
-        if user_id not in self.user_mapping:
+        user_idx = snapshot.user_mapping.get(user_id)
+        if user_idx is None:
             logger.warning(f"User {user_id} not in training data")
-            from voizy.recommender.data import get_popular_posts
-            popular_posts = get_popular_posts(self.conn, n)
-            return [{'post_id': post_id, 'score': 0.0} for post_id in popular_posts]
-
-        user_idx = self.user_mapping[user_id]
-
-        # Get scores for all posts using proper prediction format
-        # LightFM expects arrays of user_ids and item_ids with the same length
-        # For a single user, we need to repeat the user_id for each item
-        n_items = len(self.post_mapping)
-        user_idxs = [user_idx] * n_items
-        item_idxs = list(range(n_items))
-
-        scores = self.model.predict(
-            user_ids=user_idxs,
-            item_ids=item_idxs
-        )
+            return self._popular_ranked_list(depth, snapshot.model_version)
 
-        inverse_post_mapping = {v: k for k, v in self.post_mapping.items()}
-        post_scores = [(inverse_post_mapping[i], float(scores[i])) for i in range(len(scores))]
+        seen_idxs = self._get_seen_post_idxs(snapshot, user_id, user_idx)
 
-        post_scores.sort(key=lambda x: x[1], reverse=True)
+        post_ids, scores = snapshot.scoring_engine.top_k(user_idx, depth + len(seen_idxs))
+        seen = np.isin(post_ids, snapshot.scoring_engine.post_ids[seen_idxs])
 
-        if exclude_seen:
-            from voizy.recommender.data import get_user_interactions
-            seen_posts = get_user_interactions(self.conn, user_id)
-            post_scores = [ps for ps in post_scores if ps[0] not in seen_posts]
+        return RankedList(post_ids, scores, seen, snapshot.model_version)
 
-        top_posts = [{'post_id': ps[0], 'score': ps[1]} for ps in post_scores[:n]]
-        return top_posts
+    def _get_seen_post_idxs(self, snapshot: ModelSnapshot, user_id: int, user_idx: int) -> np.ndarray:
+        """
+        Get the indices of posts a known user has already interacted with
+
+        Uses the in-memory seen-items index, falling back to the database for
+        models saved without one.
+
+        Args:
+            snapshot: Snapshot serving the request
+            user_id: User ID
+            user_idx: User index in the snapshot
+
+        Returns:
+            Array of post indices
+        """
+        if snapshot.seen_items is not None:
+            return snapshot.seen_items.get(user_idx)
+
+        from voizy.recommender.lookups import get_user_interactions
+        with self.db_pool.connection() as conn:
+            seen_posts = get_user_interactions(conn, user_id, use_rollup=self.use_rollup)
+        post_idxs = snapshot.post_mapping.lookup(seen_posts)
+        return post_idxs[post_idxs >= 0]
+
+    def record_seen(self, user_id: int, post_ids: List[int]) -> None:
+        """
+        Add posts to a user's seen items without waiting for the next update
+
+        Args:
+            user_id: User ID
+            post_ids: Post IDs the user interacted with
+        """
+        snapshot = self.snapshot
+        user_idx = snapshot.user_mapping.get(user_id)
+        if snapshot.seen_items is None or user_idx is None:
+            return
+
+        post_idxs = snapshot.post_mapping.lookup(post_ids)
+        snapshot.seen_items.add(user_idx, post_idxs[post_idxs >= 0])
+
+    def update_seen_items(self, batch_size: int = 10_000) -> int:
+        """
+        Top up the seen-items index with interactions since its watermark
+
+        Args:
+            batch_size: Interactions fetched and applied per batch
+
+        Returns:
+            Number of users whose seen items changed
+        """
+        snapshot = self.snapshot
+        seen_items = snapshot.seen_items
+        if seen_items is None or seen_items.watermark is None:
+            return 0
+
+        from voizy.recommender.lookups import iter_recent_interactions
+
+        updated_users = set()
+        n_interactions = 0
+        watermark = None
+        with self.db_pool.connection() as conn:
+            for batch in iter_recent_interactions(conn, seen_items.watermark, batch_size=batch_size):
+                if not batch:
+                    continue
+                user_ids, post_ids, timestamps = zip(*batch)
+                user_idxs = snapshot.user_mapping.lookup(user_ids)
+                post_idxs = snapshot.post_mapping.lookup(post_ids)
+                known = (user_idxs >= 0) & (post_idxs >= 0)
+
+                seen_items.add_arrays(user_idxs[known], post_idxs[known])
+                updated_users.update(np.unique(user_idxs[known]).tolist())
+                n_interactions += len(batch)
+                batch_watermark = max(timestamps)
+                if watermark is None or batch_watermark > watermark:
+                    watermark = batch_watermark
+
+        if n_interactions == 0:
+            return 0
+
+        # Advanced only once every batch is applied, so a failed run is retried from the same point
+        if watermark > seen_items.watermark:
+            seen_items.watermark = watermark
+        logger.info(f"Updated seen items for {len(updated_users)} users from {n_interactions} interactions")
+
+        return len(updated_users)
+
+    def get_batch_ranked_candidates(
+            self,
+            user_ids: List[int],
+            depth: Optional[int] = None
+    ) -> Dict[int, RankedList]:
+        """
+        Get ranked candidate posts for many users in one scoring pass
+
+        Args:
+            user_ids: User IDs
+            depth: Number of unseen posts to rank per user (optional, defaults to ranked_list_depth)
+
+        Returns:
+            Mapping from user ID to ranked list
+        """
+        depth = depth or self.ranked_list_depth
+        snapshot = self.snapshot
+
+        if snapshot.scoring_engine is None:
+            logger.error("Model not trained or loaded")
+            empty = RankedList(np.empty(0, np.int64), np.empty(0, np.float32), np.empty(0, bool), None)
+            return {user_id: empty for user_id in user_ids}
+
+        unique_user_ids = list(dict.fromkeys(user_ids))
+        user_idxs = snapshot.user_mapping.lookup(unique_user_ids)
+        known = user_idxs >= 0
+        known_users = [user_id for user_id, is_known in zip(unique_user_ids, known) if is_known]
+        unknown_users = [user_id for user_id, is_known in zip(unique_user_ids, known) if not is_known]
+
+        ranked_lists = {}
+
+        if unknown_users:
+            logger.warning(f"{len(unknown_users)} users not in training data, falling back to popular posts")
+            popular = self._popular_ranked_list(depth, snapshot.model_version)
+            for user_id in unknown_users:
+                ranked_lists[user_id] = popular
+
+        if not known_users:
+            return ranked_lists
+
+        seen_idxs = [
+            self._get_seen_post_idxs(snapshot, user_id, int(user_idx))
+            for user_id, user_idx in zip(known_users, user_idxs[known])
+        ]
+        max_seen = max(len(idxs) for idxs in seen_idxs)
+
+        results = snapshot.scoring_engine.top_k_batch(user_idxs[known], depth + max_seen)
+
+        for user_id, user_seen_idxs, (post_ids, scores) in zip(known_users, seen_idxs, results):
+            seen = np.isin(post_ids, snapshot.scoring_engine.post_ids[user_seen_idxs])
+            ranked_lists[user_id] = RankedList(post_ids, scores, seen, snapshot.model_version)
+
+        return ranked_lists
+
+    def get_batch_recommendations(
+            self,
+            user_ids: List[int],
+            n: int = 10,
+            exclude_seen: bool = True
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Get post recommendations for many users in one scoring pass
+
+        Args:
+            user_ids: User IDs
+            n: Number of recommendations to return per user
+            exclude_seen: Whether to exclude posts each user has already interacted with
+
+        Returns:
+            Mapping from user ID to recommended post IDs with scores
+        """
+        ranked_lists = self.get_batch_ranked_candidates(user_ids, depth=n)
+        return {
+            user_id: ranked_list.top(n, exclude_seen=exclude_seen)
+            for user_id, ranked_list in ranked_lists.items()
+        }
 
     def update_analytics_after_recommendation(self, user_id: int, recommended_posts: List[int]) -> None:
         """
         Update analytics after showing recommendations to a user
 
+        Writes synchronously; the API queues impressions on an ImpressionWriter
+        instead so requests do not wait on the database.
+
         Args:
             user_id: User ID
             recommended_posts: List of recommended post IDs
         """
-        cursor = self.conn.cursor()
-
-        for post_id in recommended_posts:
-            query = """
-            UPDATE posts
-            SET impressions = impressions + 1
-            WHERE post_id = %s
-            """
-            cursor.execute(query, (post_id,))
-
-            query = """
-            INSERT INTO analytics_events 
-            (user_id, event_type, object_type, object_id, event_time, meta_data)
-            VALUES (%s, 'post_recommendation', 'post', %s, NOW(), '{"source": "recommender_system"}')
-            """
-            cursor.execute(query, (user_id, post_id))
-
-            query = """
-            INSERT INTO user_recommendations
-            (user_id, post_id, recommendation_time, source)
-            VALUES (%s, %s, NOW(), 'ml_recommender')
-            """
-            cursor.execute(query, (user_id, post_id))
-
-        self.conn.commit()
-        cursor.close()
\ No newline at end of file
+        from voizy.recommender.impressions import write_impressions
+        with self.db_pool.connection() as conn:
+            write_impressions(conn, [(user_id, recommended_posts, datetime.now())])
@@ -0,0 +1,242 @@
+"""
+Offline evaluation for the Voizy recommender system.
+
+Scores a sample of users in blocks through the ScoringEngine, the same
+float32 path serving uses, and compares their top-k posts with a
+time-based holdout: interactions that happened after the model's training
+data. Reports precision@k, recall@k, NDCG@k, catalog coverage and
+popularity bias.
+
+Evaluate the active model artifact against the interactions since its
+watermark:
+
+    python -m voizy.recommender.evaluation --model-path ./models/voizy_recommender --sample-users 2000
+"""
+import sys
+import json
+import logging
+import argparse
+import configparser
+from datetime import datetime
+from typing import Any, Dict, Optional
+import numpy as np
+
+from voizy.recommender.scoring import MAX_BLOCK_ELEMENTS, ScoringEngine, top_k_indices_2d
+
+logger = logging.getLogger(__name__)
+
+
+def evaluate(
+        scoring_engine: ScoringEngine,
+        test_matrix,
+        train_matrix=None,
+        k: int = 10,
+        sample_users: Optional[int] = 1000,
+        block_size: Optional[int] = None,
+        random_state: int = 42
+) -> Dict[str, Any]:
+    """
+    Compute ranking metrics for a sample of users
+
+    Posts a user interacted with in train_matrix are never recommended, as
+    in serving. Popularity bias is the mean popularity percentile (by train
+    interactions) of the recommended posts: 0.5 matches the catalog, 1.0
+    means only the most popular posts are recommended.
+
+    Args:
+        scoring_engine: Scoring engine of the model to evaluate
+        test_matrix: Held-out user-post interactions (CSR, model index space)
+        train_matrix: Interactions the model was trained on (CSR, optional)
+        k: Number of recommendations per user
+        sample_users: Number of test users to evaluate (optional, None evaluates all)
+        block_size: Number of users scored per block (optional)
+        random_state: Seed for the user sample
+
+    Returns:
+        Dictionary of metrics and the number of users evaluated
+    """
+    test_matrix = test_matrix.tocsr()
+    n_items = scoring_engine.n_items
+
+    users = np.flatnonzero(np.diff(test_matrix.indptr))
+    users = users[users < scoring_engine.n_users]
+    if sample_users is not None and len(users) > sample_users:
+        users = np.sort(np.random.default_rng(random_state).choice(users, sample_users, replace=False))
+
+    if train_matrix is not None:
+        train_matrix = train_matrix.tocsr()
+        item_counts = np.bincount(train_matrix.indices, minlength=n_items)[:n_items]
+    else:
+        item_counts = np.zeros(n_items, dtype=np.int64)
+    # Tied counts share their average rank, so the many rarely seen posts are not spread by index
+    sorted_counts = np.sort(item_counts)
+    average_rank = (
+        np.searchsorted(sorted_counts, item_counts, side='left') +
+        np.searchsorted(sorted_counts, item_counts, side='right') - 1
+    ) / 2
+    popularity_percentile = average_rank / max(n_items - 1, 1)
+
+    if block_size is None:
+        block_size = max(1, MAX_BLOCK_ELEMENTS // max(n_items, 1))
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal_dcg = np.concatenate([[1.0], np.cumsum(discounts)])  # indexed by min(relevant, k)
+
+    precision, recall, ndcg, popularity = [], [], [], []
+    recommended = np.zeros(n_items, dtype=bool)
+
+    for start in range(0, len(users), block_size):
+        block = users[start:start + block_size]
+
+        # User biases shift a whole row and do not change the ranking
+        scores = scoring_engine.user_embeddings[block] @ scoring_engine.item_embeddings.T
+        scores += scoring_engine.item_biases
+
+        if train_matrix is not None:
+            seen = train_matrix[block]
+            rows = np.repeat(np.arange(len(block)), np.diff(seen.indptr))
+            scores[rows, seen.indices] = -np.inf
+
+        top = top_k_indices_2d(scores, k)
+        valid = np.isfinite(np.take_along_axis(scores, top, axis=1))
+
+        relevant = test_matrix[block].toarray() > 0
+        hits = np.take_along_axis(relevant, top, axis=1) & valid
+        n_relevant = relevant.sum(axis=1)
+
+        precision.append(hits.sum(axis=1) / k)
+        recall.append(hits.sum(axis=1) / np.maximum(n_relevant, 1))
+        ndcg.append((hits * discounts[:top.shape[1]]).sum(axis=1) / ideal_dcg[np.minimum(n_relevant, k)])
+
+        recommended[top[valid]] = True
+        popularity.append(popularity_percentile[top[valid]])
+
+    if len(users) == 0:
+        logger.warning("No test users to evaluate")
+        return {'k': k, 'n_users': 0}
+
+    return {
+        'k': k,
+        'n_users': int(len(users)),
+        'precision': float(np.concatenate(precision).mean()),
+        'recall': float(np.concatenate(recall).mean()),
+        'ndcg': float(np.concatenate(ndcg).mean()),
+        'coverage': float(recommended.sum() / max(n_items, 1)),
+        'popularity_bias': float(np.concatenate(popularity).mean())
+    }
+
+
+def evaluate_artifact(
+        db_config: Dict[str, Any],
+        model_path: str,
+        since: Optional[datetime] = None,
+        k: int = 10,
+        sample_users: Optional[int] = 1000
+) -> Dict[str, Any]:
+    """
+    Evaluate the active model artifact on interactions after its training data
+
+    Args:
+        db_config: Database connection configuration
+        model_path: Artifact root directory
+        since: Start of the holdout (optional, defaults to the model's watermark)
+        k: Number of recommendations per user
+        sample_users: Number of test users to evaluate (optional, None evaluates all)
+
+    Returns:
+        Dictionary of metrics, the model version and the holdout size
+    """
+    from scipy.sparse import csr_matrix
+    from voizy.recommender.data import fetch_interaction_arrays
+    from voizy.recommender.engine import VoizyRecommender
+
+    recommender = VoizyRecommender(db_config, connect=False)
+    if not recommender.load_model(model_path):
+        raise RuntimeError(f"Could not load model from {model_path}")
+
+    snapshot = recommender.snapshot
+    n_users, n_posts = len(snapshot.user_mapping), len(snapshot.post_mapping)
+
+    train_matrix = None
+    if snapshot.seen_items is not None:
+        indptr, indices = snapshot.seen_items.compact()
+        train_matrix = csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(n_users, n_posts))
+        since = since or snapshot.seen_items.watermark
+
+    if since is None:
+        raise ValueError("Model has no watermark; pass the start of the holdout")
+
+    # Only distinct pairs matter, so they are grouped in the database; rows without a post are dropped
+    holdout = fetch_interaction_arrays(db_config, since=since, aggregate=True)
+    user_idxs = snapshot.user_mapping.lookup(holdout.user_ids[holdout.user_codes])
+    post_idxs = snapshot.post_mapping.lookup(holdout.post_ids[holdout.post_codes])
+    known = (user_idxs >= 0) & (post_idxs >= 0)
+
+    test_matrix = csr_matrix(
+        (np.ones(int(known.sum()), dtype=np.float32), (user_idxs[known], post_idxs[known])),
+        shape=(n_users, n_posts)
+    )
+    if train_matrix is not None:
+        # Re-engagement with already seen posts cannot be recommended, so it is not a target
+        test_matrix = test_matrix - test_matrix.multiply(train_matrix.astype(bool))
+        test_matrix.eliminate_zeros()
+
+    logger.info(
+        f"Holdout since {since}: {len(holdout)} user-post pairs, {int(known.sum())} with known users and posts"
+    )
+
+    metrics = evaluate(snapshot.scoring_engine, test_matrix, train_matrix, k=k, sample_users=sample_users)
+    metrics['model_version'] = snapshot.model_version
+    metrics['holdout_since'] = since.isoformat()
+    return metrics
+
+
+def main(argv=None) -> int:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(
+        description="Evaluate the active model artifact on interactions since it was trained"
+    )
+    parser.add_argument('--config', default='recommender_config.ini')
+    parser.add_argument('--model-path', help="Artifact root directory (optional, defaults to MODEL_PATH)")
+    parser.add_argument('--since', type=datetime.fromisoformat,
+                        help="Start of the holdout, ISO format (optional, defaults to the model's watermark)")
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--sample-users', type=int, default=1000, help="Users to evaluate; 0 evaluates all")
+    parser.add_argument('--json', action='store_true', help="Print the metrics as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    config = configparser.ConfigParser()
+    config.read(args.config)
+
+    db_config = {
+        'host': config.get('DATABASE', 'HOST', fallback='localhost'),
+        'user': config.get('DATABASE', 'USER'),
+        'password': config.get('DATABASE', 'PASSWORD'),
+        'database': config.get('DATABASE', 'DATABASE', fallback='voizy_db')
+    }
+    model_path = args.model_path or config.get('RECOMMENDER', 'MODEL_PATH', fallback='./models/voizy_recommender')
+
+    metrics = evaluate_artifact(
+        db_config,
+        model_path,
+        since=args.since,
+        k=args.k,
+        sample_users=args.sample_users or None
+    )
+
+    if args.json:
+        print(json.dumps(metrics))
+    else:
+        for name, value in metrics.items():
+            logger.info(f"{name}: {value:.4f}" if isinstance(value, float) else f"{name}: {value}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
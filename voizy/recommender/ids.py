@@ -0,0 +1,138 @@
+"""
+Array-backed ID mappings for the Voizy recommender system.
+
+This module provides the IdIndex class, which maps external user or post
+IDs to model indices with a sorted int64 array and binary search instead
+of a dict of Python ints.
+"""
+import logging
+from typing import Dict, Iterator, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class IdIndex:
+    """
+    Mapping from external IDs to model indices.
+
+    ids[i] is the external ID of model index i. Lookups binary-search a
+    sorted copy of the IDs; when the IDs are already sorted (as prepare_data
+    assigns them) the sorted copy is ids itself and no position array is
+    kept.
+    """
+
+    def __init__(self, ids: np.ndarray):
+        """
+        Initialize the index
+
+        Args:
+            ids: External IDs in model index order, without duplicates
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+
+        if len(self.ids) < 2 or np.all(self.ids[1:] > self.ids[:-1]):
+            self._sorted_ids = self.ids
+            self._positions = None
+        else:
+            self._positions = np.argsort(self.ids, kind='stable')
+            self._sorted_ids = self.ids[self._positions]
+
+    @classmethod
+    def from_mapping(cls, mapping: Dict[int, int]) -> 'IdIndex':
+        """
+        Build the index from an ID -> index dict
+
+        Args:
+            mapping: Mapping from external IDs to indices 0..n-1
+
+        Returns:
+            ID index
+        """
+        ids = np.empty(len(mapping), dtype=np.int64)
+        ids[np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping))] = np.fromiter(
+            mapping.keys(), dtype=np.int64, count=len(mapping)
+        )
+        return cls(ids)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = None) -> 'IdIndex':
+        """
+        Load the index from a .npy file
+
+        Args:
+            path: File path
+            mmap_mode: np.load memory-map mode (optional)
+
+        Returns:
+            ID index
+        """
+        return cls(np.load(path, mmap_mode=mmap_mode))
+
+    def save(self, path: str) -> None:
+        """
+        Save the IDs to a .npy file
+
+        Args:
+            path: File path
+        """
+        np.save(path, self.ids)
+
+    def lookup(self, ids) -> np.ndarray:
+        """
+        Get the model indices of many IDs
+
+        Args:
+            ids: External IDs
+
+        Returns:
+            int64 array of indices, -1 for IDs not in the index
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self._sorted_ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+
+        positions = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        found = self._sorted_ids[positions] == ids
+        if self._positions is not None:
+            positions = self._positions[positions]
+
+        return np.where(found, positions, -1).astype(np.int64)
+
+    def get(self, id_: int, default: Optional[int] = None) -> Optional[int]:
+        """
+        Get the model index of an ID
+
+        Args:
+            id_: External ID
+            default: Value returned for IDs not in the index
+
+        Returns:
+            Model index, or default
+        """
+        try:
+            index = int(self.lookup(int(id_)))
+        except (TypeError, ValueError, OverflowError):
+            return default
+        return default if index < 0 else index
+
+    def __getitem__(self, id_: int) -> int:
+        index = self.get(id_)
+        if index is None:
+            raise KeyError(id_)
+        return index
+
+    def __contains__(self, id_) -> bool:
+        return self.get(id_) is not None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids.tolist())
+
+    def keys(self) -> Iterator[int]:
+        """
+        Iterate over the external IDs in index order
+        """
+        return iter(self)
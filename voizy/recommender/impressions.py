@@ -0,0 +1,227 @@
+"""
+Write-behind recording of recommendation impressions.
+
+This module provides the ImpressionWriter class, which takes impression
+records off the request path through a bounded queue and writes them to
+the database in batches from a background thread.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Any, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (user ID, recommended post IDs, time the recommendations were served)
+ImpressionRecord = Tuple[int, Sequence[int], datetime]
+
+# Posts per aggregated impressions UPDATE statement
+UPDATE_CHUNK_SIZE = 1000
+
+
+def write_impressions(db_conn, records: List[ImpressionRecord]) -> int:
+    """
+    Write impression records to the database in one transaction
+
+    Events and user recommendations are inserted with multi-row INSERTs and
+    post impression counters are bumped with one aggregated UPDATE.
+
+    Args:
+        db_conn: Database connection
+        records: Impression records
+
+    Returns:
+        Number of (user, post) impressions written
+    """
+    rows = [
+        (user_id, post_id, served_at)
+        for user_id, post_ids, served_at in records
+        for post_id in post_ids
+    ]
+    if not rows:
+        return 0
+
+    cursor = db_conn.cursor()
+
+    # mysql.connector rewrites executemany INSERTs into multi-row statements
+    cursor.executemany(
+        """
+        INSERT INTO analytics_events
+        (user_id, event_type, object_type, object_id, event_time, meta_data)
+        VALUES (%s, 'post_recommendation', 'post', %s, %s, '{"source": "recommender_system"}')
+        """,
+        rows
+    )
+
+    cursor.executemany(
+        """
+        INSERT INTO user_recommendations
+        (user_id, post_id, recommendation_time, source)
+        VALUES (%s, %s, %s, 'ml_recommender')
+        """,
+        rows
+    )
+
+    impressions = list(Counter(post_id for _, post_id, _ in rows).items())
+    for start in range(0, len(impressions), UPDATE_CHUNK_SIZE):
+        chunk = impressions[start:start + UPDATE_CHUNK_SIZE]
+        cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+        placeholders = ", ".join(["%s"] * len(chunk))
+        params = [value for pair in chunk for value in pair] + [post_id for post_id, _ in chunk]
+
+        cursor.execute(
+            f"UPDATE posts SET impressions = impressions + CASE post_id {cases} END "
+            f"WHERE post_id IN ({placeholders})",
+            params
+        )
+
+    db_conn.commit()
+    cursor.close()
+
+    return len(rows)
+
+
+class ImpressionWriter:
+    """
+    Background writer for recommendation impressions.
+
+    enqueue() is O(1) and never touches the database. A worker thread drains
+    the queue and flushes when max_batch_size records are pending or
+    flush_interval seconds have passed. When the queue is full, new records
+    are dropped and counted rather than slowing requests down.
+    """
+
+    def __init__(
+            self,
+            db_pool,
+            max_queue_size: int = 100_000,
+            max_batch_size: int = 5000,
+            flush_interval: float = 1.0
+    ):
+        """
+        Initialize the writer
+
+        Args:
+            db_pool: DatabasePool used for flushes
+            max_queue_size: Maximum number of pending records
+            max_batch_size: Maximum number of records per flush
+            flush_interval: Maximum seconds a record waits before being flushed
+        """
+        self.db_pool = db_pool
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue[ImpressionRecord]" = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """
+        Start the background flush thread
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="impression-writer", daemon=True)
+        self._thread.start()
+        logger.info("Started impression writer thread")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop the background thread after flushing everything still queued
+
+        Args:
+            timeout: Seconds to wait for the final flush
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info(f"Stopped impression writer: {self.stats()}")
+
+    def enqueue(self, user_id: int, post_ids: Sequence[int]) -> bool:
+        """
+        Queue impressions of recommended posts for a user
+
+        Args:
+            user_id: User ID
+            post_ids: Recommended post IDs shown to the user
+
+        Returns:
+            False if the queue was full and the record was dropped
+        """
+        if not post_ids:
+            return True
+
+        try:
+            self._queue.put_nowait((user_id, tuple(post_ids), datetime.now()))
+            self.enqueued += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Impression queue full, dropped {self.dropped} records so far")
+            return False
+
+    def _drain(self, deadline: float) -> List[ImpressionRecord]:
+        """Collect up to max_batch_size records, waiting until the deadline for the first ones"""
+        records = []
+        while len(records) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0 and not self._stop.is_set():
+                    records.append(self._queue.get(timeout=timeout))
+                else:
+                    records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def flush(self, records: List[ImpressionRecord]) -> None:
+        """
+        Write a batch of records, logging (not raising) database errors
+
+        Args:
+            records: Impression records
+        """
+        if not records:
+            return
+
+        try:
+            with self.db_pool.connection() as conn:
+                self.written += write_impressions(conn, records)
+        except Exception as e:
+            self.failed += len(records)
+            logger.error(f"Error writing {len(records)} impression records: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.flush(self._drain(time.monotonic() + self.flush_interval))
+
+        # Flush whatever is left on shutdown
+        while not self._queue.empty():
+            self.flush(self._drain(time.monotonic()))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get writer counters
+
+        Returns:
+            Dictionary with queue depth and enqueued/dropped/written/failed counts
+        """
+        return {
+            'pending': self._queue.qsize(),
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'written': self.written,
+            'failed': self.failed
+        }
@@ -0,0 +1,202 @@
+"""
+Warm-start support for incremental training in the Voizy recommender system.
+
+Incremental refreshes continue training the previous LightFM model on the
+interactions that arrived since it was trained. This module persists the
+model's full training state (embeddings, biases and their optimizer
+accumulators) as plain arrays, restores it, and grows it when new users,
+posts or features appear.
+"""
+import logging
+from typing import Any, Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Per-feature arrays LightFM keeps for each side (user_*, item_*)
+STATE_FIELDS = (
+    'embeddings',
+    'embedding_gradients',
+    'embedding_momentum',
+    'biases',
+    'bias_gradients',
+    'bias_momentum'
+)
+
+# Constructor arguments needed to rebuild an equivalent model
+MODEL_PARAMS = (
+    'no_components',
+    'k',
+    'n',
+    'learning_schedule',
+    'loss',
+    'learning_rate',
+    'rho',
+    'epsilon',
+    'item_alpha',
+    'user_alpha',
+    'max_sampled'
+)
+
+STATE_PREFIX = 'lightfm_'
+
+
+def model_state_arrays(model) -> Dict[str, np.ndarray]:
+    """
+    Get a model's training state as named arrays
+
+    Args:
+        model: Trained LightFM model
+
+    Returns:
+        Mapping from artifact array name to array
+    """
+    return {
+        f"{STATE_PREFIX}{side}_{field}": getattr(model, f"{side}_{field}")
+        for side in ('user', 'item')
+        for field in STATE_FIELDS
+    }
+
+
+def model_params(model) -> Dict[str, Any]:
+    """
+    Get the constructor arguments of a model
+
+    Args:
+        model: LightFM model
+
+    Returns:
+        JSON-serializable parameters
+    """
+    params = {}
+    for name in MODEL_PARAMS:
+        value = getattr(model, name)
+        params[name] = value.item() if isinstance(value, np.generic) else value
+    return params
+
+
+def has_model_state(arrays: Dict[str, np.ndarray]) -> bool:
+    """
+    Check whether artifact arrays include a model's training state
+
+    Args:
+        arrays: Artifact arrays
+
+    Returns:
+        True if every state array is present
+    """
+    return all(
+        f"{STATE_PREFIX}{side}_{field}" in arrays
+        for side in ('user', 'item')
+        for field in STATE_FIELDS
+    )
+
+
+def restore_model(params: Dict[str, Any], arrays: Dict[str, np.ndarray], random_state: int = 42):
+    """
+    Rebuild a LightFM model from saved parameters and training state
+
+    Args:
+        params: Constructor arguments from model_params
+        arrays: Artifact arrays including the training state
+        random_state: Random seed for further training
+
+    Returns:
+        LightFM model ready for fit_partial
+    """
+    from lightfm import LightFM
+
+    model = LightFM(random_state=random_state, **params)
+    set_model_state(model, arrays)
+
+    return model
+
+
+def set_model_state(model, arrays: Dict[str, np.ndarray]) -> None:
+    """
+    Replace a model's training state with copies of saved arrays
+
+    Args:
+        model: LightFM model
+        arrays: Arrays from model_state_arrays, or an artifact including them
+    """
+    for side in ('user', 'item'):
+        for field in STATE_FIELDS:
+            # Copy out of the memory map (or snapshot); training updates these in place
+            value = np.array(arrays[f"{STATE_PREFIX}{side}_{field}"], dtype=np.float32)
+            setattr(model, f"{side}_{field}", value)
+
+
+def feature_column_map(
+        old_n_identity: int,
+        old_vocabulary: Optional[np.ndarray],
+        new_n_identity: int,
+        new_vocabulary: Optional[np.ndarray]
+) -> np.ndarray:
+    """
+    Map the feature columns of a grown feature space to the old columns
+
+    Both spaces use the feature pipeline layout: identity columns first (one
+    per entity, in index order) and then the sorted vocabulary. Existing
+    entities keep their indices, so identity column i maps to itself.
+
+    Args:
+        old_n_identity: Number of entities in the old model
+        old_vocabulary: Old feature vocabulary (optional)
+        new_n_identity: Number of entities in the new model
+        new_vocabulary: New feature vocabulary (optional)
+
+    Returns:
+        For each new column, the old column it continues, or -1 for new columns
+    """
+    old_vocabulary = np.asarray(old_vocabulary if old_vocabulary is not None else [], dtype=str)
+    new_vocabulary = np.asarray(new_vocabulary if new_vocabulary is not None else [], dtype=str)
+
+    column_map = np.full(new_n_identity + len(new_vocabulary), -1, dtype=np.int64)
+    column_map[:old_n_identity] = np.arange(old_n_identity)
+
+    if len(old_vocabulary) and len(new_vocabulary):
+        positions = np.minimum(np.searchsorted(old_vocabulary, new_vocabulary), len(old_vocabulary) - 1)
+        found = old_vocabulary[positions] == new_vocabulary
+        column_map[new_n_identity + np.flatnonzero(found)] = old_n_identity + positions[found]
+
+    return column_map
+
+
+def grow_model(model, user_column_map: np.ndarray, item_column_map: np.ndarray) -> None:
+    """
+    Resize a model's state to new user and item feature spaces in place
+
+    Columns that continue an old column keep its embedding, bias and
+    optimizer accumulators; new columns are initialized the way LightFM
+    initializes a fresh model.
+
+    Args:
+        model: LightFM model with training state
+        user_column_map: Old user column for each new column, -1 for new ones
+        item_column_map: Old item column for each new column, -1 for new ones
+    """
+    no_components = model.no_components
+    adagrad = model.learning_schedule == 'adagrad'
+
+    for side, column_map in (('user', user_column_map), ('item', item_column_map)):
+        n_columns = len(column_map)
+        known = column_map >= 0
+        sources = column_map[known]
+
+        fresh = {
+            'embeddings': ((model.random_state.rand(n_columns, no_components) - 0.5) / no_components),
+            'embedding_gradients': np.full((n_columns, no_components), 1.0 if adagrad else 0.0),
+            'embedding_momentum': np.zeros((n_columns, no_components)),
+            'biases': np.zeros(n_columns),
+            'bias_gradients': np.full(n_columns, 1.0 if adagrad else 0.0),
+            'bias_momentum': np.zeros(n_columns)
+        }
+
+        for field in STATE_FIELDS:
+            name = f"{side}_{field}"
+            grown = fresh[field].astype(np.float32)
+            grown[known] = getattr(model, name)[sources]
+            setattr(model, name, grown)
+
+        logger.info(f"Grew {side} features to {n_columns} columns ({n_columns - int(known.sum())} new)")
@@ -0,0 +1,256 @@
+"""
+Compact interaction arrays for the Voizy recommender system.
+
+Training only needs three numbers per interaction: the user index, the
+post index and the strength. This module keeps them in int32/float32
+arrays (plus optional timestamps) instead of a DataFrame with object and
+datetime columns, and builds them chunk by chunk so a streamed query result
+never has to be held in full as rows.
+"""
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, NamedTuple, Optional
+import numpy as np
+
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+
+logger = logging.getLogger(__name__)
+
+
+class InteractionArrays(NamedTuple):
+    """
+    User-post interactions in COO form.
+
+    user_codes[i] and post_codes[i] index user_ids and post_ids, which are
+    sorted, so a code is the model index prepare_data assigns. Rows fetched
+    in aggregated form carry the number of events behind each row in counts,
+    the time of the last one in timestamps and the time of the first one in
+    first_timestamps.
+    """
+    user_ids: np.ndarray
+    post_ids: np.ndarray
+    user_codes: np.ndarray
+    post_codes: np.ndarray
+    strength: np.ndarray
+    timestamps: Optional[np.ndarray] = None
+    watermark: Optional[datetime] = None
+    counts: Optional[np.ndarray] = None
+    first_timestamps: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_frame(cls, interactions_df, with_timestamps: bool = True) -> 'InteractionArrays':
+        """
+        Build the arrays from an interactions DataFrame
+
+        Args:
+            interactions_df: DataFrame with user_id, post_id, interaction_strength
+                and optionally timestamp columns
+            with_timestamps: Whether to keep the timestamp of each interaction
+
+        Returns:
+            Interaction arrays
+        """
+        import pandas as pd
+
+        interactions_df = interactions_df.dropna(subset=['user_id', 'post_id'])
+
+        # Sorted factorization gives compact indices and the ID of each index
+        user_codes, user_ids = pd.factorize(interactions_df['user_id'].to_numpy(dtype=np.int64), sort=True)
+        post_codes, post_ids = pd.factorize(interactions_df['post_id'].to_numpy(dtype=np.int64), sort=True)
+
+        timestamps = None
+        first_timestamps = None
+        watermark = None
+        if 'timestamp' in interactions_df and len(interactions_df) > 0:
+            watermark = interactions_df['timestamp'].max().to_pydatetime()
+            if with_timestamps:
+                timestamps = interactions_df['timestamp'].to_numpy(dtype='datetime64[s]')
+                if 'first_interaction' in interactions_df:
+                    first_timestamps = interactions_df['first_interaction'].to_numpy(dtype='datetime64[s]')
+
+        return cls(
+            np.asarray(user_ids, dtype=np.int64),
+            np.asarray(post_ids, dtype=np.int64),
+            user_codes.astype(np.int32),
+            post_codes.astype(np.int32),
+            interactions_df['interaction_strength'].to_numpy(dtype=np.float32),
+            timestamps,
+            watermark,
+            interactions_df['interaction_count'].to_numpy(dtype=np.int32)
+            if 'interaction_count' in interactions_df else None,
+            first_timestamps
+        )
+
+    def __len__(self) -> int:
+        return len(self.strength)
+
+    def to_matrix(self, mask: Optional[np.ndarray] = None) -> 'csr_matrix':
+        """
+        Build the user-post interactions matrix
+
+        Duplicate user-post pairs are summed.
+
+        Args:
+            mask: Boolean mask selecting the interactions to include (optional)
+
+        Returns:
+            CSR matrix of shape (number of users, number of posts)
+        """
+        from scipy.sparse import coo_matrix
+
+        user_codes, post_codes, strength = self.user_codes, self.post_codes, self.strength
+        if mask is not None:
+            user_codes, post_codes, strength = user_codes[mask], post_codes[mask], strength[mask]
+
+        return coo_matrix(
+            (strength, (user_codes, post_codes)),
+            shape=(len(self.user_ids), len(self.post_ids))
+        ).tocsr()
+
+
+class _GrowableArray:
+    """Append-only array that grows its capacity by half when full"""
+
+    def __init__(self, dtype, capacity: int = 1 << 16):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def extend(self, values: np.ndarray) -> None:
+        end = self._size + len(values)
+        if end > len(self._data):
+            grown = np.empty(max(end, len(self._data) + len(self._data) // 2), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:end] = values
+        self._size = end
+
+    def finish(self) -> np.ndarray:
+        """Get the filled part, releasing the spare capacity"""
+        data = self._data[:self._size].copy()
+        self._data = np.empty(0, dtype=self._data.dtype)
+        return data
+
+
+class _IdEncoder:
+    """Assigns int32 codes to IDs in first-seen order across chunks"""
+
+    def __init__(self):
+        self._sorted_ids = np.empty(0, dtype=np.int64)
+        self._sorted_codes = np.empty(0, dtype=np.int32)
+
+    def encode(self, ids: np.ndarray) -> np.ndarray:
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+
+        positions = np.searchsorted(self._sorted_ids, unique_ids)
+        found = np.zeros(len(unique_ids), dtype=bool)
+        in_range = positions < len(self._sorted_ids)
+        found[in_range] = self._sorted_ids[positions[in_range]] == unique_ids[in_range]
+
+        codes = np.empty(len(unique_ids), dtype=np.int32)
+        codes[found] = self._sorted_codes[positions[found]]
+
+        new = ~found
+        n_known = len(self._sorted_ids)
+        codes[new] = np.arange(n_known, n_known + int(new.sum()), dtype=np.int32)
+        if new.any():
+            self._sorted_ids = np.insert(self._sorted_ids, positions[new], unique_ids[new])
+            self._sorted_codes = np.insert(self._sorted_codes, positions[new], codes[new])
+
+        return codes[inverse.ravel()]
+
+    def finish(self):
+        """Get the sorted IDs and the sorted position of every code"""
+        rank = np.empty(len(self._sorted_codes), dtype=np.int32)
+        rank[self._sorted_codes] = np.arange(len(self._sorted_codes), dtype=np.int32)
+        return self._sorted_ids, rank
+
+
+class InteractionArraysBuilder:
+    """
+    Builds InteractionArrays from a stream of interaction chunks.
+
+    Each chunk is reduced to int32 codes and float32 strengths as it
+    arrives, so peak memory stays close to the size of the final arrays.
+    """
+
+    def __init__(self, with_timestamps: bool = False):
+        """
+        Initialize the builder
+
+        Args:
+            with_timestamps: Whether to keep the timestamp of each interaction
+                (needed for time-based validation splits)
+        """
+        self.with_timestamps = with_timestamps
+        self._users = _IdEncoder()
+        self._posts = _IdEncoder()
+        self._user_codes = _GrowableArray(np.int32)
+        self._post_codes = _GrowableArray(np.int32)
+        self._strength = _GrowableArray(np.float32)
+        self._timestamps = _GrowableArray('datetime64[s]') if with_timestamps else None
+        self._counts = None
+        self._first_timestamps = None
+        self._watermark = None
+
+    def add_chunk(self, chunk) -> None:
+        """
+        Add a chunk of interactions
+
+        Args:
+            chunk: DataFrame with user_id, post_id, interaction_strength and
+                timestamp columns, and interaction_count and first_interaction
+                for aggregated rows
+        """
+        chunk = chunk.dropna(subset=['user_id', 'post_id'])
+        if len(chunk) == 0:
+            return
+
+        self._user_codes.extend(self._users.encode(chunk['user_id'].to_numpy(dtype=np.int64)))
+        self._post_codes.extend(self._posts.encode(chunk['post_id'].to_numpy(dtype=np.int64)))
+        self._strength.extend(chunk['interaction_strength'].to_numpy(dtype=np.float32))
+
+        if 'interaction_count' in chunk:
+            if self._counts is None:
+                self._counts = _GrowableArray(np.int32)
+            self._counts.extend(chunk['interaction_count'].to_numpy(dtype=np.int32))
+
+        if 'timestamp' in chunk:
+            timestamps = chunk['timestamp'].to_numpy(dtype='datetime64[s]')
+            latest = timestamps.max()
+            if self._watermark is None or latest > self._watermark:
+                self._watermark = latest
+            if self._timestamps is not None:
+                self._timestamps.extend(timestamps)
+
+        if self._timestamps is not None and 'first_interaction' in chunk:
+            if self._first_timestamps is None:
+                self._first_timestamps = _GrowableArray('datetime64[s]')
+            self._first_timestamps.extend(chunk['first_interaction'].to_numpy(dtype='datetime64[s]'))
+
+    def finish(self) -> InteractionArrays:
+        """
+        Get the interaction arrays with codes in sorted ID order
+
+        Returns:
+            Interaction arrays
+        """
+        user_ids, user_rank = self._users.finish()
+        post_ids, post_rank = self._posts.finish()
+
+        user_codes = self._user_codes.finish()
+        np.take(user_rank, user_codes, out=user_codes)
+        post_codes = self._post_codes.finish()
+        np.take(post_rank, post_codes, out=post_codes)
+
+        return InteractionArrays(
+            user_ids,
+            post_ids,
+            user_codes,
+            post_codes,
+            self._strength.finish(),
+            self._timestamps.finish() if self._timestamps is not None else None,
+            self._watermark.astype(datetime) if self._watermark is not None else None,
+            self._counts.finish() if self._counts is not None else None,
+            self._first_timestamps.finish() if self._first_timestamps is not None else None
+        )
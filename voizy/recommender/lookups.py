@@ -0,0 +1,128 @@
+"""
+Request-time database lookups for the Voizy recommender system.
+
+These helpers run plain cursor queries and return Python lists, so the
+serving path can use them without importing the pandas-based training
+data pipeline in data.py.
+"""
+import logging
+from typing import Iterator, List, Tuple
+from datetime import datetime, timedelta
+
+from voizy.db.queries import (
+    USER_INTERACTIONS_QUERY,
+    USER_INTERACTIONS_ROLLUP_QUERY,
+    RECENT_INTERACTIONS_QUERY,
+    POPULAR_POSTS_QUERY,
+    POPULAR_POSTS_ROLLUP_QUERY
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_user_interactions(db_conn, user_id: int, use_rollup: bool = False) -> List[int]:
+    """
+    Get posts that user has already interacted with
+
+    Args:
+        db_conn: Database connection
+        user_id: User ID
+        use_rollup: Read the user_post_interactions rollup instead of the
+            event tables; it only covers the rollup's retention window
+
+    Returns:
+        List of post IDs
+    """
+    cursor = db_conn.cursor()
+
+    if use_rollup:
+        cursor.execute(USER_INTERACTIONS_ROLLUP_QUERY, (user_id,))
+    else:
+        cursor.execute(USER_INTERACTIONS_QUERY, (user_id, user_id, user_id, user_id))
+    result = cursor.fetchall()
+    cursor.close()
+
+    seen_posts = [row[0] for row in result]
+    return seen_posts
+
+
+def iter_recent_interactions(
+        db_conn,
+        since: datetime,
+        batch_size: int = 10_000
+) -> Iterator[List[Tuple[int, int, datetime]]]:
+    """
+    Stream user-post interactions since a point in time in batches
+
+    Rows are fetched batch_size at a time, so a long catch-up window is
+    never held in memory at once. Rows without a user or post are skipped.
+
+    Args:
+        db_conn: Database connection
+        since: Only return interactions at or after this time
+        batch_size: Maximum rows per batch
+
+    Yields:
+        Lists of (user ID, post ID, timestamp) tuples
+    """
+    cursor = db_conn.cursor()
+
+    try:
+        cursor.execute(RECENT_INTERACTIONS_QUERY, (since, since, since, since))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [
+                (int(row[0]), int(row[1]), row[2])
+                for row in rows
+                if row[0] is not None and row[1] is not None
+            ]
+    finally:
+        cursor.close()
+
+
+def fetch_recent_interactions(db_conn, since: datetime) -> List[Tuple[int, int, datetime]]:
+    """
+    Get all user-post interactions since a point in time
+
+    Args:
+        db_conn: Database connection
+        since: Only return interactions at or after this time
+
+    Returns:
+        List of (user ID, post ID, timestamp) tuples
+    """
+    return [row for batch in iter_recent_interactions(db_conn, since) for row in batch]
+
+
+def get_popular_posts(db_conn, n: int = 10, days_limit: int = 7, use_rollup: bool = False) -> List[int]:
+    """
+    Get most popular recent posts as fallback
+
+    Args:
+        db_conn: Database connection
+        n: Number of posts to return
+        days_limit: Limit to posts from the last N days
+        use_rollup: Score posts from the user_post_interactions rollup
+            instead of joining the event tables
+
+    Returns:
+        List of post IDs
+    """
+    cursor = db_conn.cursor()
+
+    cutoff_date = datetime.now() - timedelta(days=days_limit)
+    cutoff_date_str = cutoff_date.strftime('%Y-%m-%d %H:%M:%S')
+
+    query = (POPULAR_POSTS_ROLLUP_QUERY if use_rollup else POPULAR_POSTS_QUERY).format(
+        cutoff_date=cutoff_date_str,
+        limit=n
+    )
+
+    cursor.execute(query)
+    result = cursor.fetchall()
+    cursor.close()
+
+    popular_posts = [row[0] for row in result]
+    return popular_posts
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Interactions rollup for the Voizy recommender system.
+
+Keeps the user_post_interactions table, one row per user, post and day with
+the summed interaction strength, the number of events and the time of the
+last one, up to date from the raw event tables. Each source table is read
+from a per-source auto-increment ID watermark (interaction_rollup_watermarks),
+and the rolled-up rows and the new watermark are committed together, so a
+re-run after a failure never counts an event twice.
+
+Training, the seen-posts fallback and the popular posts query can then read
+this compact table instead of scanning the event logs.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, NamedTuple, Optional
+
+from voizy.db.queries import ROLLUP_INSERT_QUERY
+
+logger = logging.getLogger(__name__)
+
+
+class RollupSource(NamedTuple):
+    """
+    An event table rolled up into user_post_interactions.
+    """
+    table: str
+    id_column: str
+    post_column: str
+    time_column: str
+    weight: int
+    condition: str = ""
+
+
+# Same events and weights as INTERACTIONS_QUERY
+ROLLUP_SOURCES = (
+    RollupSource(
+        'analytics_events', 'event_id', 'object_id', 'event_time', 1,
+        "AND event_type = 'post_view' AND object_type = 'post' AND object_id IS NOT NULL"
+    ),
+    RollupSource('post_reactions', 'post_reaction_id', 'post_id', 'reacted_at', 3),
+    RollupSource('comments', 'comment_id', 'post_id', 'created_at', 4),
+    RollupSource('post_shares', 'share_id', 'post_id', 'shared_at', 5)
+)
+
+
+def _lock_watermark(cursor, source: RollupSource) -> int:
+    """Get a source's watermark, locking its row until the transaction ends"""
+    cursor.execute(
+        "INSERT IGNORE INTO interaction_rollup_watermarks (source_table, last_id) VALUES (%s, 0)",
+        (source.table,)
+    )
+    cursor.execute(
+        "SELECT last_id FROM interaction_rollup_watermarks WHERE source_table = %s FOR UPDATE",
+        (source.table,)
+    )
+    return int(cursor.fetchone()[0])
+
+
+def _settled_max_id(cursor, source: RollupSource, after_id: int, settle_seconds: int) -> Optional[int]:
+    """
+    Get the highest ID of the source's rows written at least settle_seconds ago
+
+    Rows inserted by transactions that are still open may commit with lower
+    IDs than rows already visible; leaving the newest rows for the next run
+    keeps the watermark from skipping over them.
+    """
+    cursor.execute(
+        f"SELECT MAX({source.id_column}) FROM {source.table} "
+        f"WHERE {source.id_column} > %s AND {source.time_column} <= NOW() - INTERVAL %s SECOND",
+        (after_id, settle_seconds)
+    )
+    row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def update_interactions_rollup(
+        db_conn,
+        batch_size: int = 100_000,
+        retention_days: int = 90,
+        settle_seconds: int = 60
+) -> Dict[str, int]:
+    """
+    Roll up the events added since the last run
+
+    Each source table is processed in ID ranges of batch_size rows; every
+    range is committed together with the advanced watermark. Concurrent runs
+    serialize on the watermark rows. Rollup rows older than retention_days
+    are deleted.
+
+    Args:
+        db_conn: Database connection
+        batch_size: Source rows per transaction
+        retention_days: Days of interactions to keep in the rollup
+        settle_seconds: Leave events younger than this for the next run
+
+    Returns:
+        Mapping from source table to the number of source IDs processed
+    """
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    processed = {}
+
+    cursor = db_conn.cursor()
+    try:
+        for source in ROLLUP_SOURCES:
+            query = ROLLUP_INSERT_QUERY.format(**source._asdict())
+            processed[source.table] = 0
+
+            # The settled bound scans every row after the watermark, so it is taken once per run
+            target_id = _settled_max_id(cursor, source, _lock_watermark(cursor, source), settle_seconds)
+            db_conn.commit()
+            if target_id is None:
+                continue
+
+            while True:
+                last_id = _lock_watermark(cursor, source)
+                if last_id >= target_id:
+                    # A concurrent run got there first
+                    db_conn.commit()
+                    break
+
+                upper_id = min(target_id, last_id + batch_size)
+                cursor.execute(query, (last_id, upper_id, cutoff))
+                cursor.execute(
+                    "UPDATE interaction_rollup_watermarks SET last_id = %s WHERE source_table = %s",
+                    (upper_id, source.table)
+                )
+                db_conn.commit()
+
+                processed[source.table] += upper_id - last_id
+                if upper_id >= target_id:
+                    break
+
+        cursor.execute(
+            "DELETE FROM user_post_interactions WHERE interaction_date < %s",
+            (cutoff.date(),)
+        )
+        db_conn.commit()
+    except Exception:
+        db_conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    logger.info(
+        "Updated interactions rollup: " +
+        ", ".join(f"{table} +{count} IDs" for table, count in processed.items())
+    )
+
+    return processed
+
+
+def backfill_interactions_rollup(
+        db_conn,
+        days: int = 30,
+        batch_size: int = 100_000,
+        settle_seconds: int = 60
+) -> Dict[str, int]:
+    """
+    Rebuild the rollup from the last days of events
+
+    Empties the rollup, moves each watermark to just before the source's
+    first event in the window and rolls everything up from there. Safe to
+    re-run; each run starts over.
+
+    Args:
+        db_conn: Database connection
+        days: Days of events to roll up
+        batch_size: Source rows per transaction
+        settle_seconds: Leave events younger than this for the next run
+
+    Returns:
+        Mapping from source table to the number of source IDs processed
+    """
+    cutoff = datetime.now() - timedelta(days=days)
+
+    cursor = db_conn.cursor()
+    try:
+        for source in ROLLUP_SOURCES:
+            _lock_watermark(cursor, source)
+
+        cursor.execute("DELETE FROM user_post_interactions")
+
+        for source in ROLLUP_SOURCES:
+            cursor.execute(
+                f"SELECT MIN({source.id_column}) FROM {source.table} WHERE {source.time_column} >= %s",
+                (cutoff,)
+            )
+            first_id = cursor.fetchone()[0]
+            if first_id is not None:
+                start_id = int(first_id) - 1
+            else:
+                # No events in the window: start after the current newest row
+                cursor.execute(f"SELECT COALESCE(MAX({source.id_column}), 0) FROM {source.table}")
+                start_id = int(cursor.fetchone()[0])
+
+            cursor.execute(
+                "UPDATE interaction_rollup_watermarks SET last_id = %s WHERE source_table = %s",
+                (start_id, source.table)
+            )
+
+        db_conn.commit()
+    except Exception:
+        db_conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    logger.info(f"Reset interactions rollup to the last {days} days, rolling up...")
+
+    return update_interactions_rollup(
+        db_conn,
+        batch_size=batch_size,
+        retention_days=days,
+        settle_seconds=settle_seconds
+    )
+
+
+def run_rollup(db_config: Dict[str, Any], **params) -> Dict[str, int]:
+    """
+    Update the rollup on a new connection
+
+    Args:
+        db_config: Database connection configuration
+        **params: Keyword arguments for update_interactions_rollup
+
+    Returns:
+        Result of update_interactions_rollup
+    """
+    from voizy.db.connection import get_db_connection
+
+    conn = get_db_connection(db_config)
+    try:
+        return update_interactions_rollup(conn, **params)
+    finally:
+        conn.close()
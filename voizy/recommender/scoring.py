@@ -0,0 +1,288 @@
+"""
+Vectorized scoring for the Voizy recommender system.
+
+This module provides the ScoringEngine class, which keeps the user and post
+representations of a trained LightFM model as contiguous float32 arrays and
+answers top-k requests with a single matrix-vector product.
+"""
+import logging
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the number of scores materialized per block in batch scoring
+# (16M float32 scores = 64 MB)
+MAX_BLOCK_ELEMENTS = 1 << 24
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Get the indices of the k highest scores, best first
+
+    Args:
+        scores: 1-D array of scores
+        k: Number of indices to return
+
+    Returns:
+        Array of indices sorted by descending score
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if k >= n:
+        return np.argsort(-scores, kind='stable')
+
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def top_k_indices_2d(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Get the indices of the k highest scores in each row, best first
+
+    Args:
+        scores: 2-D array of scores, one row per user
+        k: Number of indices to return per row
+
+    Returns:
+        Array of shape (n_rows, min(k, n_cols)) with indices sorted by descending score
+    """
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+
+    if k == n:
+        return np.argsort(-scores, axis=1, kind='stable')
+
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class ScoringEngine:
+    """
+    Exact top-k scorer over LightFM user and post representations.
+
+    A LightFM prediction is the dot product of the user and item
+    representations plus both biases. The engine takes those arrays from the
+    model once, so a request costs one float32 matrix-vector product and an
+    argpartition instead of a call to LightFM.predict.
+    """
+
+    def __init__(
+            self,
+            user_biases: np.ndarray,
+            user_embeddings: np.ndarray,
+            item_biases: np.ndarray,
+            item_embeddings: np.ndarray,
+            post_ids: np.ndarray
+    ):
+        """
+        Initialize the scoring engine
+
+        Args:
+            user_biases: User biases, one per user index
+            user_embeddings: User representations, shape (n_users, n_components)
+            item_biases: Post biases, one per post index
+            item_embeddings: Post representations, shape (n_posts, n_components)
+            post_ids: Post ID for each post index
+        """
+        self.user_biases = np.ascontiguousarray(user_biases, dtype=np.float32)
+        self.user_embeddings = np.ascontiguousarray(user_embeddings, dtype=np.float32)
+        self.item_biases = np.ascontiguousarray(item_biases, dtype=np.float32)
+        self.item_embeddings = np.ascontiguousarray(item_embeddings, dtype=np.float32)
+        self.post_ids = np.asarray(post_ids, dtype=np.int64)
+        self.ann_index = None
+
+        if self.item_embeddings.shape[0] != self.post_ids.shape[0]:
+            raise ValueError(
+                f"Got {self.item_embeddings.shape[0]} post representations for {self.post_ids.shape[0]} post IDs"
+            )
+
+    @classmethod
+    def from_model(
+            cls,
+            model,
+            post_ids: np.ndarray,
+            n_users: int,
+            user_features=None,
+            item_features=None
+    ) -> 'ScoringEngine':
+        """
+        Build a scoring engine from a trained LightFM model
+
+        Args:
+            model: Trained LightFM model
+            post_ids: Post ID for each post index
+            n_users: Number of users in the model
+            user_features: User features matrix the model was trained with (optional)
+            item_features: Post features matrix the model was trained with (optional)
+
+        Returns:
+            Scoring engine
+        """
+        n_items = len(post_ids)
+
+        # Without feature matrices LightFM uses identity features, which map
+        # user/post index i to row i of the embedding tables
+        user_biases, user_embeddings = model.get_user_representations(user_features)
+        item_biases, item_embeddings = model.get_item_representations(item_features)
+
+        return cls(
+            user_biases[:n_users],
+            user_embeddings[:n_users],
+            item_biases[:n_items],
+            item_embeddings[:n_items],
+            post_ids
+        )
+
+    @property
+    def n_users(self) -> int:
+        return self.user_embeddings.shape[0]
+
+    @property
+    def n_items(self) -> int:
+        return self.item_embeddings.shape[0]
+
+    def build_ann_index(self, **params) -> None:
+        """
+        Build an approximate nearest-neighbour index over the post representations
+
+        Once built, top_k retrieves candidates from the index and re-scores
+        them exactly instead of scoring the whole catalog.
+
+        Args:
+            **params: Keyword arguments for IVFIndex
+        """
+        from voizy.recommender.ann import IVFIndex
+        self.ann_index = IVFIndex(**params).build(self.item_embeddings, self.item_biases)
+
+    def score(self, user_idx: int) -> np.ndarray:
+        """
+        Score every post for a user
+
+        Args:
+            user_idx: User index in the model
+
+        Returns:
+            float32 array of scores, one per post index
+        """
+        scores = self.item_embeddings @ self.user_embeddings[user_idx]
+        scores += self.item_biases
+        scores += self.user_biases[user_idx]
+        return scores
+
+    def top_k(
+            self,
+            user_idx: int,
+            k: int,
+            exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the k best posts for a user
+
+        Args:
+            user_idx: User index in the model
+            k: Number of posts to return
+            exclude: Post indices to leave out (optional)
+
+        Returns:
+            Tuple containing:
+                - post_ids: Post IDs sorted by descending score
+                - scores: Matching scores
+        """
+        if self.ann_index is not None:
+            result = self._top_k_approximate(user_idx, k, exclude)
+            if result is not None:
+                return result
+
+        scores = self.score(user_idx)
+
+        if exclude is not None and len(exclude) > 0:
+            scores[exclude] = -np.inf
+
+        top = top_k_indices(scores, k)
+        top = top[np.isfinite(scores[top])]
+
+        return self.post_ids[top], scores[top]
+
+    def _top_k_approximate(
+            self,
+            user_idx: int,
+            k: int,
+            exclude: Optional[np.ndarray] = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get the k best posts among the ANN candidates for a user
+
+        Returns None when the probed lists hold fewer than k usable posts, so
+        the caller can fall back to exact scoring.
+        """
+        candidates = self.ann_index.search(self.user_embeddings[user_idx])
+
+        if exclude is not None and len(exclude) > 0:
+            candidates = candidates[~np.isin(candidates, exclude)]
+
+        if len(candidates) < k:
+            return None
+
+        scores = self.item_embeddings[candidates] @ self.user_embeddings[user_idx]
+        scores += self.item_biases[candidates]
+        scores += self.user_biases[user_idx]
+
+        top = top_k_indices(scores, k)
+
+        return self.post_ids[candidates[top]], scores[top]
+
+    def top_k_batch(
+            self,
+            user_idxs: Sequence[int],
+            k: int,
+            exclude: Optional[Sequence[Optional[np.ndarray]]] = None,
+            block_size: Optional[int] = None
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get the k best posts for many users at once
+
+        Users are scored in blocks with one user-by-post matrix multiply per
+        block, so the work is done by BLAS rather than one call per user.
+        Batch scoring is always exact; the ANN index is not consulted.
+
+        Args:
+            user_idxs: User indices in the model
+            k: Number of posts to return per user
+            exclude: Post indices to leave out, one entry per user (optional)
+            block_size: Number of users per block (optional, derived from the
+                catalog size by default)
+
+        Returns:
+            List of (post_ids, scores) tuples in the same order as user_idxs
+        """
+        user_idxs = np.asarray(user_idxs, dtype=np.int64)
+        if block_size is None:
+            block_size = max(1, MAX_BLOCK_ELEMENTS // max(self.n_items, 1))
+
+        results = []
+        for start in range(0, len(user_idxs), block_size):
+            block = user_idxs[start:start + block_size]
+
+            scores = self.user_embeddings[block] @ self.item_embeddings.T
+            scores += self.item_biases
+            scores += self.user_biases[block][:, np.newaxis]
+
+            if exclude is not None:
+                for row, excluded in enumerate(exclude[start:start + block_size]):
+                    if excluded is not None and len(excluded) > 0:
+                        scores[row, excluded] = -np.inf
+
+            top = top_k_indices_2d(scores, k)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+
+            for row in range(len(block)):
+                valid = np.isfinite(top_scores[row])
+                results.append((self.post_ids[top[row][valid]], top_scores[row][valid]))
+
+        return results
@@ -0,0 +1,174 @@
+"""
+In-memory index of posts each user has already interacted with.
+
+This module provides the SeenItemsIndex class, which keeps seen posts in
+model index space so excluding them from recommendations is a NumPy mask
+over the score vector instead of a database query per request.
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SeenItemsIndex:
+    """
+    Seen posts per user, in model index space.
+
+    Interactions from training are stored in CSR form (indptr/indices, one
+    sorted int32 row per user). Events that arrive after training are kept
+    in a small per-user overlay of sorted int32 arrays until the next
+    training run rebuilds the base.
+    """
+
+    def __init__(
+            self,
+            indptr: np.ndarray,
+            indices: np.ndarray,
+            watermark: Optional[datetime] = None
+    ):
+        """
+        Initialize the index
+
+        Args:
+            indptr: CSR row pointers, length n_users + 1
+            indices: CSR post indices, sorted within each row
+            watermark: Time of the latest interaction covered by the index (optional)
+        """
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.watermark = watermark
+        self._recent: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_interactions(cls, interactions_matrix, watermark: Optional[datetime] = None) -> 'SeenItemsIndex':
+        """
+        Build the index from a user-post interactions matrix
+
+        Args:
+            interactions_matrix: Sparse user-item interaction matrix
+            watermark: Time of the latest interaction in the matrix (optional)
+
+        Returns:
+            Seen-items index
+        """
+        matrix = interactions_matrix.tocsr()
+        matrix.sum_duplicates()
+        matrix.sort_indices()
+        return cls(matrix.indptr, matrix.indices, watermark=watermark)
+
+    @property
+    def n_users(self) -> int:
+        return self.indptr.shape[0] - 1
+
+    def get(self, user_idx: int) -> np.ndarray:
+        """
+        Get the posts a user has interacted with
+
+        Args:
+            user_idx: User index in the model
+
+        Returns:
+            Sorted int32 array of post indices
+        """
+        base = self.indices[self.indptr[user_idx]:self.indptr[user_idx + 1]]
+        recent = self._recent.get(user_idx)
+        if recent is None:
+            return base
+        return np.union1d(base, recent)
+
+    def compact(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Merge the recent-events overlay into CSR arrays
+
+        Returns:
+            Tuple containing:
+                - indptr: CSR row pointers
+                - indices: CSR post indices covering base and recent interactions
+        """
+        with self._lock:
+            recent_users = sorted(self._recent)
+
+        counts = np.diff(self.indptr)
+        segments = []
+        start = 0
+        for user_idx in recent_users:
+            segments.append(self.indices[self.indptr[start]:self.indptr[user_idx]])
+            row = self.get(user_idx)
+            segments.append(row)
+            counts[user_idx] = len(row)
+            start = user_idx + 1
+        segments.append(self.indices[self.indptr[start]:])
+
+        indptr = np.zeros(self.indptr.shape[0], dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        return indptr, np.concatenate(segments).astype(np.int32)
+
+    def add(self, user_idx: int, post_idxs: Iterable[int]) -> None:
+        """
+        Record new interactions for a user
+
+        Args:
+            user_idx: User index in the model
+            post_idxs: Post indices the user interacted with
+        """
+        post_idxs = np.asarray(list(post_idxs), dtype=np.int32)
+        if len(post_idxs) == 0:
+            return
+
+        with self._lock:
+            recent = self._recent.get(user_idx)
+            if recent is not None:
+                post_idxs = np.concatenate([recent, post_idxs])
+            # Replace rather than mutate so concurrent readers see a complete array
+            self._recent[user_idx] = np.unique(post_idxs)
+
+    def add_many(self, pairs: Iterable[Tuple[int, int]], watermark: Optional[datetime] = None) -> int:
+        """
+        Record a batch of new (user index, post index) interactions
+
+        Args:
+            pairs: (user index, post index) pairs
+            watermark: New watermark once the batch is applied (optional)
+
+        Returns:
+            Number of users updated
+        """
+        pairs = np.asarray(list(pairs), dtype=np.int64).reshape(-1, 2)
+        return self.add_arrays(pairs[:, 0], pairs[:, 1], watermark=watermark)
+
+    def add_arrays(
+            self,
+            user_idxs: np.ndarray,
+            post_idxs: np.ndarray,
+            watermark: Optional[datetime] = None
+    ) -> int:
+        """
+        Record a batch of new interactions given as parallel index arrays
+
+        Args:
+            user_idxs: User index of each interaction
+            post_idxs: Post index of each interaction
+            watermark: New watermark once the batch is applied (optional)
+
+        Returns:
+            Number of users updated
+        """
+        user_idxs = np.asarray(user_idxs, dtype=np.int64)
+        post_idxs = np.asarray(post_idxs, dtype=np.int32)
+
+        # Group by user with one sort instead of a Python loop over pairs
+        order = np.argsort(user_idxs, kind='stable')
+        users, starts = np.unique(user_idxs[order], return_index=True)
+        for user_idx, user_post_idxs in zip(users.tolist(), np.split(post_idxs[order], starts[1:])):
+            self.add(user_idx, user_post_idxs)
+
+        if watermark is not None and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+
+        return len(users)
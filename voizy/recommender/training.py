@@ -0,0 +1,542 @@
+"""
+Out-of-process model training for the Voizy recommender system.
+
+Training runs in a spawned child process that fetches data, fits the
+LightFM model and writes a new model artifact. The serving process only
+loads the finished artifact and swaps it in, so LightFM.fit never holds
+the serving process's GIL and requests never see half-updated mappings.
+
+TrainingJobManager makes sure at most one such job runs at a time and
+keeps the stage timings of the current and last jobs for status reporting.
+"""
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+StageCallback = Callable[[str], None]
+
+
+def train_model_artifact(
+        db_config: Dict[str, Any],
+        model_path: str,
+        chunksize: Optional[int] = None,
+        aggregate_interactions: bool = True,
+        use_rollup: bool = False,
+        rollup_retention_days: int = 90,
+        days_limit: int = 30,
+        post_days_limit: int = 60,
+        num_components: int = 30,
+        learning_rate: float = 0.05,
+        epochs: int = 20,
+        num_threads: int = 1,
+        loss: str = 'warp',
+        max_sampled: int = 10,
+        validation_fraction: float = 0.1,
+        validation_users: int = 2000,
+        patience: int = 2,
+        incremental: bool = False,
+        incremental_epochs: int = 3,
+        full_retrain_interval: float = 7 * 24 * 3600,
+        on_stage: Optional[StageCallback] = None
+) -> Dict[str, Any]:
+    """
+    Fetch data, train a model and write it as the active artifact
+
+    This is the entry point of the training process. With incremental set,
+    the active model is updated with fit_partial on the interactions since
+    its watermark, unless it has no training state or its last full
+    training is older than full_retrain_interval; then the model is trained
+    from scratch.
+
+    Args:
+        db_config: Database connection configuration
+        model_path: Artifact root directory
+        chunksize: Rows per chunk when streaming interactions (optional)
+        aggregate_interactions: Sum interactions per user and post in the database
+        use_rollup: Bring the user_post_interactions rollup up to date and
+            read full trainings' interactions from it instead of the event
+            tables; incremental updates always read the event tables
+        rollup_retention_days: Days of interactions kept in the rollup
+        days_limit: Limit interactions to the last N days
+        post_days_limit: Limit post features to posts from the last N days
+        num_components: Number of latent factors
+        learning_rate: Learning rate
+        epochs: Maximum number of epochs
+        num_threads: Number of threads for training and evaluation
+        loss: LightFM loss function
+        max_sampled: Maximum negative samples per positive for the WARP losses
+        validation_fraction: Share of the most recent interactions held out for early stopping
+        validation_users: Number of validation users sampled for the per-epoch metric
+        patience: Epochs without improvement before training stops
+        incremental: Whether to prefer warm-start updates over full training
+        incremental_epochs: Number of epochs over the new interactions
+        full_retrain_interval: Seconds after a full training before the next one
+        on_stage: Called with the name of each stage as it starts (optional)
+
+    Returns:
+        Dictionary with the training mode, the model version and the number
+        of users and posts
+    """
+    from voizy.db.connection import dispose_sqlalchemy_engine
+    from voizy.recommender.data import (
+        fetch_interaction_arrays,
+        fetch_user_features,
+        fetch_post_features
+    )
+    from voizy.recommender.engine import VoizyRecommender
+
+    def stage(name: str) -> None:
+        logger.info(f"Training stage: {name}")
+        if on_stage is not None:
+            on_stage(name)
+
+    try:
+        recommender = VoizyRecommender(db_config, connect=False)
+
+        if use_rollup:
+            from voizy.recommender.rollup import run_rollup
+
+            stage("rollup")
+            run_rollup(db_config, retention_days=max(rollup_retention_days, days_limit))
+
+        if incremental and _can_update(recommender, model_path, full_retrain_interval):
+            return _update_model_artifact(
+                recommender,
+                db_config,
+                model_path,
+                post_days_limit=post_days_limit,
+                chunksize=chunksize,
+                epochs=incremental_epochs,
+                num_threads=num_threads,
+                stage=stage
+            )
+
+        stage("fetch")
+        interactions = fetch_interaction_arrays(
+            db_config,
+            days_limit=days_limit,
+            chunksize=chunksize or 100_000,
+            # Timestamps are only kept for the validation split
+            with_timestamps=validation_fraction > 0,
+            aggregate=aggregate_interactions,
+            use_rollup=use_rollup
+        )
+        user_features_df = fetch_user_features(db_config)
+        post_features_df = fetch_post_features(db_config, days_limit=post_days_limit)
+
+        stage("prepare")
+        interactions_matrix, user_features_matrix, post_features_matrix = recommender.prepare_data(
+            interactions, user_features_df, post_features_df
+        )
+        train_matrix, validation_matrix = recommender.split_validation(
+            interactions, validation_fraction, interactions_matrix
+        )
+        del interactions, interactions_matrix, user_features_df, post_features_df
+
+        recommender.train_model(
+            train_matrix,
+            user_features_matrix,
+            post_features_matrix,
+            num_components=num_components,
+            learning_rate=learning_rate,
+            epochs=epochs,
+            num_threads=num_threads,
+            loss=loss,
+            max_sampled=max_sampled,
+            validation_matrix=validation_matrix,
+            validation_users=validation_users,
+            patience=patience,
+            on_stage=stage
+        )
+
+        stage("save")
+        if not recommender.save_model(model_path):
+            raise RuntimeError(f"Could not save model artifact to {model_path}")
+
+        return {
+            'mode': 'full',
+            'model_version': recommender.model_version,
+            'num_users': len(recommender.user_mapping),
+            'num_posts': len(recommender.post_mapping)
+        }
+    finally:
+        dispose_sqlalchemy_engine()
+
+
+def _can_update(recommender, model_path: str, full_retrain_interval: float) -> bool:
+    """Load the active model's training state and check it is fit for a warm-start update"""
+    from voizy.recommender.artifact import is_artifact
+
+    if not is_artifact(model_path) or not recommender.load_model(model_path, restore_training_state=True):
+        logger.info("No model artifact to update, training from scratch")
+        return False
+
+    if recommender.model is None or recommender.seen_items is None or recommender.seen_items.watermark is None:
+        logger.info(f"Model {recommender.model_version} has no training state, training from scratch")
+        return False
+
+    if recommender.full_trained_at is None or (
+            datetime.now() - recommender.full_trained_at > timedelta(seconds=full_retrain_interval)
+    ):
+        logger.info(f"Full retrain due (last at {recommender.full_trained_at}), training from scratch")
+        return False
+
+    return True
+
+
+def _update_model_artifact(
+        recommender,
+        db_config: Dict[str, Any],
+        model_path: str,
+        post_days_limit: int,
+        chunksize: Optional[int],
+        epochs: int,
+        num_threads: int,
+        stage: StageCallback
+) -> Dict[str, Any]:
+    """Warm-start the loaded model on interactions since its watermark and write the result"""
+    from voizy.recommender.data import (
+        fetch_interactions_data,
+        fetch_user_features,
+        fetch_post_features
+    )
+
+    since = recommender.seen_items.watermark
+
+    stage("fetch")
+    # Always from the event tables: rollup rows cover whole days, so reading them since the
+    # watermark would re-fit that day's interactions the model was already trained on
+    interactions_df = fetch_interactions_data(db_config, chunksize=chunksize, since=since)
+
+    if len(interactions_df) == 0:
+        logger.info(f"No interactions since {since}, keeping model {recommender.model_version}")
+        return {
+            'mode': 'incremental',
+            'model_version': recommender.model_version,
+            'num_users': len(recommender.user_mapping),
+            'num_posts': len(recommender.post_mapping)
+        }
+
+    user_features_df = fetch_user_features(db_config)
+    post_features_df = fetch_post_features(db_config, days_limit=post_days_limit)
+
+    stage("prepare")
+    interactions_matrix, user_features_matrix, post_features_matrix = recommender.prepare_incremental_data(
+        interactions_df, user_features_df, post_features_df
+    )
+    del interactions_df, user_features_df, post_features_df
+
+    recommender.train_incremental(
+        interactions_matrix,
+        user_features_matrix,
+        post_features_matrix,
+        epochs=epochs,
+        num_threads=num_threads,
+        on_stage=stage
+    )
+
+    stage("save")
+    if not recommender.save_model(model_path):
+        raise RuntimeError(f"Could not save model artifact to {model_path}")
+
+    return {
+        'mode': 'incremental',
+        'model_version': recommender.model_version,
+        'num_users': len(recommender.user_mapping),
+        'num_posts': len(recommender.post_mapping)
+    }
+
+
+def _training_process_main(events, db_config: Dict[str, Any], model_path: str, params: Dict[str, Any]) -> None:
+    """Run train_model_artifact in the child, reporting stages and the outcome on a queue"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        result = train_model_artifact(
+            db_config,
+            model_path,
+            on_stage=lambda name: events.put(('stage', name)),
+            **params
+        )
+        events.put(('result', result))
+    except Exception as e:
+        logger.exception("Training process failed")
+        events.put(('error', f"{type(e).__name__}: {e}"))
+
+
+def run_training_process(
+        db_config: Dict[str, Any],
+        model_path: str,
+        on_stage: Optional[StageCallback] = None,
+        **params
+) -> Dict[str, Any]:
+    """
+    Train a model in a fresh child process and wait for it
+
+    The child is started with the spawn method, so it does not inherit the
+    server's threads, locks or database connections.
+
+    Args:
+        db_config: Database connection configuration
+        model_path: Artifact root directory
+        on_stage: Called in this process as the child enters each stage (optional)
+        **params: Keyword arguments for train_model_artifact
+
+    Returns:
+        Result of train_model_artifact
+    """
+    context = multiprocessing.get_context('spawn')
+    events = context.Queue()
+    process = context.Process(
+        target=_training_process_main,
+        args=(events, db_config, model_path, params),
+        name="voizy-training",
+        daemon=True
+    )
+    process.start()
+
+    result, error = None, None
+    while result is None and error is None:
+        try:
+            kind, value = events.get(timeout=1.0)
+        except queue.Empty:
+            if not process.is_alive():
+                break
+            continue
+
+        if kind == 'stage':
+            if on_stage is not None:
+                on_stage(value)
+        elif kind == 'result':
+            result = value
+        else:
+            error = value
+
+    process.join()
+
+    if error is not None:
+        raise RuntimeError(f"Training process failed: {error}")
+    if result is None:
+        raise RuntimeError(f"Training process exited with code {process.exitcode} without a result")
+
+    return result
+
+
+def retrain_and_swap(
+        recommender,
+        db_config: Dict[str, Any],
+        model_path: str,
+        on_stage: Optional[StageCallback] = None,
+        **params
+) -> Dict[str, Any]:
+    """
+    Train a new model out of process and swap it into a serving recommender
+
+    Requests keep running on the current snapshot until the new artifact is
+    fully loaded; the swap itself is one reference assignment.
+
+    Args:
+        recommender: Serving VoizyRecommender
+        db_config: Database connection configuration
+        model_path: Artifact root directory
+        on_stage: Called with the name of each stage as it starts (optional)
+        **params: Keyword arguments for train_model_artifact
+
+    Returns:
+        Result of train_model_artifact
+    """
+    result = run_training_process(db_config, model_path, on_stage=on_stage, **params)
+
+    if on_stage is not None:
+        on_stage("load")
+
+    if not recommender.load_model(model_path):
+        raise RuntimeError(f"Could not load trained model {result['model_version']} from {model_path}")
+
+    logger.info(
+        f"Swapped in model {result['model_version']} "
+        f"({result['num_users']} users, {result['num_posts']} posts)"
+    )
+
+    return result
+
+
+class TrainingJobManager:
+    """
+    Single-flight runner for retrain-and-swap jobs.
+
+    At most one job runs at a time. Requests made while a job is running
+    are coalesced into it instead of starting another training run. Each
+    job records its stages with start times and durations.
+    """
+
+    def __init__(
+            self,
+            get_recommender: Callable[[], Any],
+            db_config: Dict[str, Any],
+            model_path: str,
+            on_success: Optional[Callable[[Dict[str, Any]], None]] = None,
+            **params
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            get_recommender: Returns the serving VoizyRecommender
+            db_config: Database connection configuration
+            model_path: Artifact root directory
+            on_success: Called with the training result after each successful swap (optional)
+            **params: Keyword arguments for train_model_artifact
+        """
+        self.get_recommender = get_recommender
+        self.db_config = db_config
+        self.model_path = model_path
+        self.on_success = on_success
+        self.params = params
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._done = threading.Event()
+        self._done.set()
+
+        self._job: Optional[Dict[str, Any]] = None
+        self._stages: List[Dict[str, Any]] = []
+        self._stage_started = None
+        self._coalesced = 0
+
+        self.last_success_at: Optional[datetime] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return not self._done.is_set()
+
+    def start(self, trigger: str = "manual") -> bool:
+        """
+        Start a job unless one is already running
+
+        Args:
+            trigger: What requested the job, e.g. "manual" or "scheduled"
+
+        Returns:
+            True if a new job was started, False if the request was coalesced
+            into the running job
+        """
+        with self._lock:
+            if self.running:
+                self._coalesced += 1
+                logger.info(f"Training job {self._job['job_id']} already running, coalesced {trigger} request")
+                return False
+
+            self._done.clear()
+            self._job = {
+                'job_id': uuid.uuid4().hex[:12],
+                'trigger': trigger,
+                'state': 'running',
+                'started_at': datetime.now(),
+                'finished_at': None,
+                'error': None
+            }
+            self._stages = []
+            self._stage_started = None
+            self._coalesced = 0
+
+            self._thread = threading.Thread(target=self._run, name="training-job", daemon=True)
+            self._thread.start()
+
+        logger.info(f"Started training job {self._job['job_id']} ({trigger})")
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the running job, if any, to finish
+
+        Args:
+            timeout: Maximum seconds to wait (optional)
+
+        Returns:
+            True if no job is running any more
+        """
+        return self._done.wait(timeout)
+
+    def _on_stage(self, name: str) -> None:
+        """Close the current stage and open the next one"""
+        now = time.monotonic()
+        with self._lock:
+            if self._stages and self._stage_started is not None:
+                self._stages[-1]['duration_seconds'] = now - self._stage_started
+            self._stages.append({'name': name, 'started_at': datetime.now(), 'duration_seconds': None})
+            self._stage_started = now
+
+    def _run(self) -> None:
+        job = self._job
+        try:
+            result = retrain_and_swap(
+                self.get_recommender(),
+                self.db_config,
+                self.model_path,
+                on_stage=self._on_stage,
+                **self.params
+            )
+
+            if self.on_success is not None:
+                self.on_success(result)
+
+            with self._lock:
+                job['state'] = 'succeeded'
+                self.last_success_at = datetime.now()
+                self.last_result = result
+        except Exception as e:
+            logger.error(f"Training job {job['job_id']} failed: {e}")
+            with self._lock:
+                job['state'] = 'failed'
+                job['error'] = str(e)
+                self.last_error = str(e)
+        finally:
+            with self._lock:
+                if self._stages and self._stage_started is not None:
+                    self._stages[-1]['duration_seconds'] = time.monotonic() - self._stage_started
+                job['finished_at'] = datetime.now()
+            self._done.set()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the state of the current or last job
+
+        Returns:
+            Dictionary with the job state, current stage, per-stage timings and
+            the last successful run
+        """
+        with self._lock:
+            job = dict(self._job) if self._job is not None else {}
+            stages = [dict(stage) for stage in self._stages]
+
+            if self.running and stages and self._stage_started is not None:
+                stages[-1]['duration_seconds'] = time.monotonic() - self._stage_started
+
+            return {
+                'state': job.get('state', 'idle'),
+                'job_id': job.get('job_id'),
+                'trigger': job.get('trigger'),
+                'stage': stages[-1]['name'] if stages and self.running else None,
+                'started_at': job.get('started_at'),
+                'finished_at': job.get('finished_at'),
+                'stages': stages,
+                'coalesced_requests': self._coalesced,
+                'error': job.get('error'),
+                'last_success_at': self.last_success_at,
+                'last_model_version': self.last_result['model_version'] if self.last_result else None,
+                'last_training_mode': self.last_result.get('mode') if self.last_result else None,
+                'last_error': self.last_error
+            }